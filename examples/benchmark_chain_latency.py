@@ -0,0 +1,50 @@
+import time
+from dataclasses import dataclass
+from tuyaux.pipeline import Pipeline, PipeNode
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.steps import FuncStep
+
+# A chain of no-op nodes: the run time is the scheduling latency between nodes
+CHAIN_LENGTH = 2000
+
+
+def increment(value: int) -> int:
+    return value + 1
+
+
+@dataclass
+class BenchmarkContext(BasePipelineContext):
+    seed: PipeVar[int] = PipeVar.new_field(0)
+
+
+def build_pipeline() -> tuple[Pipeline, BenchmarkContext]:
+    context = BenchmarkContext()
+    IncrementStep = FuncStep.new(increment)
+    pipeline = Pipeline(BenchmarkContext, "Chain latency benchmark")
+    parent_node, parent_var = pipeline.root_node, context.seed
+    for i in range(CHAIN_LENGTH):
+        result_var = PipeVar(0)
+        node = PipeNode(f"Node {i}").add_steps(
+            IncrementStep(result_var.as_output(), None, "", parent_var)
+        )
+        parent_node >> node
+        parent_node, parent_var = node, result_var
+    pipeline.build(check_io=False)
+    return pipeline, context
+
+
+def main():
+    for inline_limit in (0, 64):
+        pipeline, context = build_pipeline()
+        pipeline.inline_limit = inline_limit
+        start = time.perf_counter()
+        pipeline.execute(context)
+        duration = time.perf_counter() - start
+        print(
+            f"inline_limit={inline_limit:<3} {duration * 1000:7.1f} ms, "
+            f"{duration / CHAIN_LENGTH * 1e6:5.1f} us per node"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from tuyaux.pipeline import Pipeline, PipeNode
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.serialization import load_pipeline, save_pipeline
+from tuyaux.steps import FuncStep
+
+# Every node feeds two children: the tree has 2**(DEPTH + 1) - 1 nodes
+DEPTH = 10
+
+
+def increment(value: int) -> int:
+    return value + 1
+
+
+@dataclass
+class BenchmarkContext(BasePipelineContext):
+    seed: PipeVar[int] = PipeVar.new_field(0)
+
+
+def build_pipeline() -> tuple[Pipeline, BenchmarkContext]:
+    context = BenchmarkContext()
+    IncrementStep = FuncStep.new(increment)
+    pipeline = Pipeline(BenchmarkContext, "Cold start benchmark")
+    layer = [(pipeline.root_node, context.seed)]
+    for depth in range(DEPTH + 1):
+        next_layer: list[tuple[PipeNode, PipeVar[int]]] = []
+        for i, (parent_node, parent_var) in enumerate(layer):
+            for j in range(1 if depth == 0 else 2):
+                result_var = PipeVar(0)
+                node = PipeNode(f"Node {depth}.{2 * i + j}").add_steps(
+                    IncrementStep(result_var.as_output(), None, "", parent_var)
+                )
+                parent_node >> node
+                next_layer.append((node, result_var))
+        layer = next_layer
+    pipeline.build()
+    return pipeline, context
+
+
+def main():
+    start = time.perf_counter()
+    pipeline, context = build_pipeline()
+    build_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pipeline.pkl")
+        save_pipeline(pipeline, context, path)
+        start = time.perf_counter()
+        loaded_pipeline, _ = load_pipeline(path)
+        load_time = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+    print(f"{len(loaded_pipeline.nodes)} nodes, {size / 1024:.0f} KiB")
+    print(f"build + validate: {build_time * 1000:.1f} ms")
+    print(f"load:             {load_time * 1000:.1f} ms")
+    print(f"speedup:          x{build_time / load_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
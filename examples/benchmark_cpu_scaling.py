@@ -0,0 +1,67 @@
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+from tuyaux.backends import FREE_THREADED, ExecutionBackend, InterpreterBackend
+from tuyaux.pipeline import Pipeline, PipeNode
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.steps import FuncStep
+from example_utils import count_primes
+
+# Independent CPU bound nodes, run with 1 to 16 workers. Subinterpreters import
+# example_utils, the examples directory must be in PYTHONPATH.
+NODE_COUNT = 32
+LIMIT = 60_000
+WORKER_COUNTS = (1, 2, 4, 8, 16)
+
+
+@dataclass
+class BenchmarkContext(BasePipelineContext):
+    limit: PipeVar[int] = PipeVar.new_field(LIMIT)
+
+
+def build_pipeline() -> tuple[Pipeline, BenchmarkContext]:
+    context = BenchmarkContext()
+    CountPrimesStep = FuncStep.new(count_primes)
+    pipeline = Pipeline(BenchmarkContext, "CPU scaling benchmark")
+    for i in range(NODE_COUNT):
+        pipeline.root_node >> PipeNode(f"Node {i}").add_steps(
+            CountPrimesStep(PipeVar(0).as_output(), None, "", context.limit)
+        )
+    pipeline.build()
+    return pipeline, context
+
+
+def run(backend: ExecutionBackend, workers: int) -> float:
+    pipeline, context = build_pipeline()
+    context.thread_count = workers
+    pipeline.backend = backend
+    start = time.perf_counter()
+    pipeline.execute(context)
+    duration = time.perf_counter() - start
+    if isinstance(backend, InterpreterBackend):
+        backend.close()
+    return duration
+
+
+def main():
+    print(f"Python {sys.version.split()[0]}, free-threaded: {FREE_THREADED}")
+    modes: dict[str, Callable[[int], ExecutionBackend]] = {
+        "threads": lambda workers: ExecutionBackend()
+    }
+    if InterpreterBackend().uses_interpreters:
+        modes["subinterpreters"] = InterpreterBackend
+    print(f"{'workers':>8}" + "".join(f"{mode:>18}" for mode in modes))
+
+    baselines: dict[str, float] = {}
+    for workers in WORKER_COUNTS:
+        timings = []
+        for mode, new_backend in modes.items():
+            duration = run(new_backend(workers), workers)
+            baselines.setdefault(mode, duration)
+            timings.append(f"{duration:8.2f}s x{baselines[mode] / duration:<6.1f}")
+        print(f"{workers:>8}" + "".join(f"{timing:>18}" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import time
+from dataclasses import dataclass
+from functools import reduce
+from tuyaux.pipeline import Pipeline, PipeNode
+from tuyaux.context import BasePipelineContext, PipeVar
+
+# Layers fully connected to the next one: (LAYERS - 1) * WIDTH**2 edges
+LAYERS = 11
+WIDTH = 100
+
+
+@dataclass
+class BenchmarkContext(BasePipelineContext):
+    seed: PipeVar[int] = PipeVar.new_field(0)
+
+
+def make_layers() -> tuple[Pipeline, list[list[PipeNode]]]:
+    pipeline = Pipeline(BenchmarkContext, "Graph construction benchmark")
+    layers = [
+        [PipeNode(f"Node {depth}.{i}") for i in range(WIDTH)] for depth in range(LAYERS)
+    ]
+    return pipeline, layers
+
+
+def wire_operators() -> Pipeline:
+    pipeline, layers = make_layers()
+    compositions = [reduce(lambda comp, node: comp & node, layer) for layer in layers]
+    pipeline.root_node >> compositions[0]
+    for parents, children in zip(compositions, compositions[1:]):
+        parents >> children
+    return pipeline
+
+
+def wire_connect() -> Pipeline:
+    pipeline, layers = make_layers()
+    pipeline.connect([pipeline.root_node], layers[0])
+    for parents, children in zip(layers, layers[1:]):
+        pipeline.connect(parents, children)
+    return pipeline
+
+
+def wire_edges() -> Pipeline:
+    pipeline, layers = make_layers()
+    pipeline.add_edges(
+        (parent_node, child_node)
+        for parents, children in zip([[pipeline.root_node], *layers], layers)
+        for parent_node in parents
+        for child_node in children
+    )
+    return pipeline
+
+
+def main():
+    print(f"{LAYERS * WIDTH} nodes, {(LAYERS - 1) * WIDTH**2 + WIDTH} edges")
+    for name, wire in (
+        ("a & b >> c & d", wire_operators),
+        ("connect", wire_connect),
+        ("add_edges", wire_edges),
+    ):
+        start = time.perf_counter()
+        pipeline = wire()
+        wire_time = time.perf_counter() - start
+        start = time.perf_counter()
+        pipeline.build(check_io=False)
+        build_time = time.perf_counter() - start
+        print(
+            f"{name:<15} wiring {wire_time * 1000:8.1f} ms, "
+            f"build {build_time * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
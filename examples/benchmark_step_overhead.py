@@ -0,0 +1,71 @@
+import time
+from dataclasses import dataclass
+from tuyaux.pipeline import PipeNode
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.steps import FuncStep
+
+# Framework overhead of a no-op FuncStep, alone and in the step loop of a node
+ITERATIONS = 200_000
+STEPS_PER_NODE = 100
+TARGET = 2e-6
+
+
+def noop(a: int, b: int, scale: int = 1) -> int:
+    return a
+
+
+@dataclass
+class BenchmarkContext(BasePipelineContext):
+    a: PipeVar[int] = PipeVar.new_field(1)
+    b: PipeVar[int] = PipeVar.new_field(2)
+    result: PipeVar[int] = PipeVar.new_field(0)
+
+
+def measure(run, count: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        run()
+        best = min(best, (time.perf_counter() - start) / count)
+    return best
+
+
+def main():
+    context = BenchmarkContext()
+    NoopStep = FuncStep.new(noop)
+    step = NoopStep(
+        context.result.as_output(), None, "", context.a, context.b.as_input(), scale=2
+    )
+
+    def run_step():
+        for _ in range(ITERATIONS):
+            step.run(context)
+
+    def call_function():
+        for _ in range(ITERATIONS):
+            noop(1, 2, scale=2)
+
+    node = PipeNode("Benchmark node").add_steps(
+        *(
+            NoopStep(context.result.as_output(), None, "", context.a, context.b)
+            for _ in range(STEPS_PER_NODE)
+        )
+    )
+
+    def run_node():
+        for _ in range(ITERATIONS // STEPS_PER_NODE):
+            node.run_steps(context)
+
+    baseline = measure(call_function, ITERATIONS)
+    results = {
+        "FuncStep.run": measure(run_step, ITERATIONS) - baseline,
+        "PipeNode.run_steps": measure(run_node, ITERATIONS) - baseline,
+    }
+    print(f"function call: {baseline * 1e6:.2f} us")
+    for name, overhead in results.items():
+        verdict = "ok" if overhead < TARGET else f"over {TARGET * 1e6:.0f} us"
+        print(f"{name} overhead: {overhead * 1e6:.2f} us per step ({verdict})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from tuyaux.distributed import Coordinator
+from tuyaux.pipeline import Pipeline, PipeNode
+from example_utils import ExampleContext, AdditionStep, MutliplyStep
+from tuyaux.context import PipeVar
+
+
+def main():
+    context = ExampleContext(input_x=PipeVar(1.5), input_y=PipeVar(8), thread_count=4)
+
+    node1 = PipeNode("Remote node 1").add_steps(
+        AdditionStep(
+            a_field=context.input_x.as_input(),
+            b_field=context.input_y.as_input(),
+            res_field=context.result_step1.as_output(),
+        )
+    )
+    node2 = PipeNode("Remote node 2").add_steps(
+        MutliplyStep(
+            a_field=context.input_x.as_input(),
+            b_field=context.input_y.as_input(),
+            res_field=context.result_step3.as_output(),
+        )
+    )
+    node3 = PipeNode("Remote node 3").add_steps(
+        AdditionStep(
+            a_field=context.result_step1.as_input(),
+            b_field=context.result_step3.as_input(),
+            res_field=context.result_step5.as_output(),
+        )
+    )
+
+    pipeline = Pipeline(ExampleContext, "Distributed Pipeline")
+    pipeline.build(pipeline.root_node >> (node1 & node2), (node1 & node2) >> node3)
+
+    # Workers on other hosts are started with: python -m tuyaux.distributed HOST PORT
+    with Coordinator() as coordinator:
+        workers = coordinator.spawn_local_workers(2)
+        coordinator.wait_for_workers(2, timeout=10)
+        pipeline.backend = coordinator
+        pipeline.execute(context)
+
+    for worker in workers:
+        worker.wait()
+    print(f"Result: {context.result_step5.get()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import threading
+import time
+from dataclasses import dataclass
+from tuyaux.pipeline import Pipeline, PipeNode
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.scheduling import FairScheduler, set_global_scheduler
+from tuyaux.steps import FuncStep
+
+# Concurrent runs of wide pipelines sharing 4 workers, the "interactive" tenant
+# weighs 3 times more than the "batch" one
+WIDTH = 40
+STEP_DURATION = 0.01
+RUNS_PER_TENANT = 4
+
+
+def wait(value: int) -> int:
+    time.sleep(STEP_DURATION)
+    return value
+
+
+@dataclass
+class FairContext(BasePipelineContext):
+    seed: PipeVar[int] = PipeVar.new_field(0)
+
+
+def build_pipeline(name: str) -> tuple[Pipeline, FairContext]:
+    context = FairContext()
+    WaitStep = FuncStep.new(wait)
+    pipeline = Pipeline(FairContext, name)
+    for i in range(WIDTH):
+        pipeline.root_node >> PipeNode(f"wait {i}").add_steps(
+            WaitStep(PipeVar(0).as_output(), None, "", context.seed)
+        )
+    pipeline.build(check_io=False)
+    return pipeline, context
+
+
+def main():
+    scheduler = FairScheduler(max_workers=4, weights={"interactive": 3.0})
+    set_global_scheduler(scheduler)
+    durations: dict[str, list[float]] = {"batch": [], "interactive": []}
+
+    def run(tenant: str, index: int):
+        pipeline, context = build_pipeline(f"{tenant} {index}")
+        start = time.perf_counter()
+        pipeline.execute(context, tenant=tenant)
+        durations[tenant].append(time.perf_counter() - start)
+
+    threads = [
+        threading.Thread(target=run, args=(tenant, i))
+        for i in range(RUNS_PER_TENANT)
+        for tenant in durations
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    peak_threads = 0
+    while any(thread.is_alive() for thread in threads):
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - start
+    set_global_scheduler(None)
+    scheduler.shutdown()
+
+    print(f"{len(threads)} runs in {total:.3f}s, at most {peak_threads} threads")
+    for tenant, tenant_durations in durations.items():
+        print(f"{tenant}: slowest run {max(tenant_durations):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
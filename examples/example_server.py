@@ -0,0 +1,56 @@
+import os
+import tempfile
+import time
+from tuyaux.pipeline import Pipeline, PipeNode
+from tuyaux.server import PipelineClient, PipelineServer
+from example_utils import ExampleContext, AdditionStep, MutliplyStep
+
+# Started as a daemon with:
+#   python -m tuyaux.server /tmp/tuyaux.sock example_server:build_pipeline
+REQUESTS = 5
+
+
+def build_pipeline() -> tuple[Pipeline, ExampleContext]:
+    context = ExampleContext()
+    node1 = PipeNode("Addition").add_steps(
+        AdditionStep(
+            a_field=context.input_x.as_input(),
+            b_field=context.input_y.as_input(),
+            res_field=context.result_step1.as_output(),
+        )
+    )
+    node2 = PipeNode("Multiplication").add_steps(
+        MutliplyStep(
+            a_field=context.input_x.as_input(),
+            b_field=context.input_y.as_input(),
+            res_field=context.result_step3.as_output(),
+        )
+    )
+    pipeline = Pipeline(ExampleContext, "Server Pipeline")
+    pipeline.build(pipeline.root_node >> (node1 & node2))
+    return pipeline, context
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "tuyaux.sock")
+    with PipelineServer(path, thread_count=4) as server:
+        server.register(*build_pipeline())
+        server.start()
+        while not os.path.exists(path):
+            time.sleep(0.01)
+
+        with PipelineClient(path) as client:
+            start = time.perf_counter()
+            for i in range(REQUESTS):
+                results = client.run(
+                    "Server Pipeline",
+                    {"input_x": float(i), "input_y": 2.0},
+                    outputs=["result_step1", "result_step3"],
+                )
+            duration = time.perf_counter() - start
+        print(f"last results: {results}")
+        print(f"{duration / REQUESTS * 1000:.1f} ms per request, steps sleep 1000 ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import time
+from dataclasses import dataclass
+from tuyaux.pipeline import Pipeline, PipeNode
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.simulation import ScheduleSimulator
+from tuyaux.steps import FuncStep
+
+# A load step fanning out to enrichments of various lengths, then a merge
+ENRICHMENT_DURATIONS = (0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.05, 0.05)
+
+
+def wait(value: int, duration: float) -> int:
+    time.sleep(duration)
+    return value
+
+
+@dataclass
+class SimulationContext(BasePipelineContext):
+    seed: PipeVar[int] = PipeVar.new_field(0)
+
+
+def build_pipeline() -> tuple[Pipeline, SimulationContext]:
+    context = SimulationContext()
+    WaitStep = FuncStep.new(wait)
+    pipeline = Pipeline(SimulationContext, "Simulated pipeline")
+    loaded = PipeVar(0)
+    load = PipeNode("load", estimated_duration=0.1).add_steps(
+        WaitStep(loaded.as_output(), None, "", context.seed, 0.1)
+    )
+    merge = PipeNode("merge", estimated_duration=0.05).add_steps(
+        WaitStep(PipeVar(0).as_output(), None, "", loaded, 0.05)
+    )
+    pipeline.root_node >> load
+    for i, duration in enumerate(ENRICHMENT_DURATIONS):
+        enrichment = PipeNode(f"enrich {i}", estimated_duration=duration).add_steps(
+            WaitStep(PipeVar(0).as_output(), None, "", loaded, duration)
+        )
+        load >> enrichment >> merge
+    pipeline.build(check_io=False)
+    return pipeline, context
+
+
+def main():
+    pipeline, context = build_pipeline()
+    simulator = ScheduleSimulator(pipeline)
+    results = simulator.sweep(range(1, 9))
+    print(simulator.report(results))
+
+    for result in (results[0], simulator.recommend(results)):
+        context.thread_count = result.workers
+        start = time.perf_counter()
+        pipeline.execute(context)
+        print(
+            f"{result.workers} workers: simulated {result.makespan:.3f}s, "
+            f"measured {time.perf_counter() - start:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
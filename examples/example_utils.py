@@ -124,3 +124,15 @@ class SkipStep(BaseStep[ExampleContext]):
         logging.info(f"{self.name}")
         self.skipped()
         time.sleep(1)
+
+
+def count_primes(limit: int) -> int:
+    # Pure Python CPU bound work, importable by subinterpreters
+    count = 0
+    for candidate in range(2, limit):
+        for divisor in range(2, int(candidate**0.5) + 1):
+            if candidate % divisor == 0:
+                break
+        else:
+            count += 1
+    return count
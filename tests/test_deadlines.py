@@ -0,0 +1,126 @@
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.pipeline import PipeNode, Pipeline
+from tuyaux.resources import Resource
+from tuyaux.steps import FuncStep, StatusEnum
+
+
+def wait(value: int, duration: float) -> int:
+    time.sleep(duration)
+    return value
+
+
+def use(resource: object, value: int, duration: float) -> int:
+    time.sleep(duration)
+    return value
+
+
+WaitStep = FuncStep.new(wait)
+UseStep = FuncStep.new(use)
+
+
+@dataclass
+class DeadlineContext(BasePipelineContext):
+    value: PipeVar[int] = PipeVar.new_field(1)
+
+
+def wait_node(ctx: DeadlineContext, name: str, duration: float, **kwargs) -> PipeNode:
+    return PipeNode(name, **kwargs).add_steps(
+        WaitStep(PipeVar(0).as_output(), None, "", ctx.value, duration)
+    )
+
+
+def execute(pipeline: Pipeline, ctx: DeadlineContext, **kwargs):
+    # Hanging runs fail the test instead of blocking the suite
+    thread = threading.Thread(
+        target=pipeline.execute, args=(ctx,), kwargs=kwargs, daemon=True
+    )
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+
+
+def test_optional_node_dropped_before_start():
+    ctx = DeadlineContext()
+    pipeline = Pipeline(DeadlineContext, "deadline")
+    optional = wait_node(ctx, "optional", 0.0, optional=True, estimated_duration=10)
+    child = wait_node(ctx, "child", 0.0)
+    pipeline.root_node >> optional >> child
+    pipeline.build(check_io=False)
+    execute(pipeline, ctx, deadline=0.5)
+
+    assert pipeline.runtime_error is None
+    assert optional.status is StatusEnum.SKIPPED
+    assert pipeline.dropped_nodes == [optional]
+    assert child.status is StatusEnum.COMPLETE
+    assert pipeline.final_node.status is StatusEnum.COMPLETE
+
+
+def test_optional_node_dropped_while_running():
+    ctx = DeadlineContext()
+    pipeline = Pipeline(DeadlineContext, "deadline")
+    # Cancelled between its steps once the deadline passed
+    optional = wait_node(ctx, "optional", 0.3, optional=True).add_steps(
+        WaitStep(PipeVar(0).as_output(), None, "", ctx.value, 0.3)
+    )
+    required = wait_node(ctx, "required", 0.5)
+    pipeline.root_node >> optional
+    pipeline.root_node >> required
+    pipeline.build(check_io=False)
+    execute(pipeline, ctx, deadline=0.1)
+
+    assert pipeline.runtime_error is None
+    assert optional.status is StatusEnum.SKIPPED
+    assert pipeline.dropped_nodes == [optional]
+    assert required.status is StatusEnum.COMPLETE
+    assert pipeline.final_node.status is StatusEnum.COMPLETE
+
+
+def test_optional_node_dropped_while_waiting_for_a_pool():
+    ctx = DeadlineContext()
+    pipeline = Pipeline(DeadlineContext, "deadline")
+    pipeline.resources.add("db", object, max_size=1)
+    holder = PipeNode("holder").add_steps(
+        UseStep(PipeVar(0).as_output(), None, "", Resource("db"), ctx.value, 1.0)
+    )
+    optional = PipeNode("optional", optional=True, estimated_duration=0.0).add_steps(
+        UseStep(PipeVar(0).as_output(), None, "", Resource("db"), ctx.value, 0.0)
+    )
+    child = wait_node(ctx, "child", 0.0)
+    pipeline.root_node >> holder
+    pipeline.root_node >> wait_node(ctx, "parent", 0.1) >> optional >> child
+    pipeline.build(check_io=False)
+    execute(pipeline, ctx, deadline=0.3)
+
+    assert pipeline.runtime_error is None
+    assert optional.status is StatusEnum.SKIPPED
+    assert child.status is StatusEnum.COMPLETE
+    assert pipeline.final_node.status is StatusEnum.COMPLETE
+
+
+@pytest.mark.parametrize("pruned_last", [True, False])
+def test_join_of_dropped_and_pruned_nodes_runs(pruned_last: bool):
+    ctx = DeadlineContext()
+    pipeline = Pipeline(DeadlineContext, "deadline")
+    dropped = wait_node(ctx, "dropped", 0.0, optional=True, estimated_duration=10)
+    pruned = wait_node(ctx, "pruned", 0.0)
+    pruned | (lambda: time.sleep(0.2 if pruned_last else 0.0) or False)
+    join = wait_node(ctx, "join", 0.0)
+    if pruned_last:
+        pipeline.root_node >> dropped
+    else:
+        pipeline.root_node >> wait_node(ctx, "slow", 0.2) >> dropped
+    pipeline.root_node >> pruned
+    pipeline.connect([dropped, pruned], [join])
+    pipeline.build(check_io=False)
+    execute(pipeline, ctx, deadline=1.0)
+
+    assert pipeline.runtime_error is None
+    assert dropped.status is StatusEnum.SKIPPED
+    assert pruned.status is StatusEnum.CONDITION_FAILED
+    assert join.status is StatusEnum.COMPLETE
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.pipeline import PipeNode, Pipeline
+from tuyaux.steps import CopyStep, FuncStep
+
+calls: list[int] = []
+
+
+def triple(value: int) -> int:
+    calls.append(value)
+    return value * 3
+
+
+def add_one(value: int) -> int:
+    return value + 1
+
+
+TripleStep = FuncStep.new(triple)
+AddOneStep = FuncStep.new(add_one)
+
+
+@dataclass
+class DedupContext(BasePipelineContext):
+    value: PipeVar[int] = PipeVar.new_field(1)
+    shifted: PipeVar[int] = PipeVar.new_field(5)
+
+
+def triple_node(ctx: DedupContext, name: str) -> tuple[PipeNode, PipeVar]:
+    result = PipeVar(0)
+    node = PipeNode(name).add_steps(TripleStep(result.as_output(), None, "", ctx.value))
+    return node, result
+
+
+def run(pipeline: Pipeline, ctx: DedupContext):
+    calls.clear()
+    pipeline.execute(ctx)
+    assert pipeline.runtime_error is None
+
+
+def test_duplicate_of_an_ancestor_is_copied():
+    ctx = DedupContext()
+    pipeline = Pipeline(DedupContext, "dedup")
+    first, first_result = triple_node(ctx, "first")
+    second, second_result = triple_node(ctx, "second")
+    pipeline.root_node >> first >> second
+    pipeline.build(deduplicate=True)
+
+    assert [(d.node, d.canonical_node) for d in pipeline.deduplicated_steps] == [
+        ("second", "first")
+    ]
+    assert isinstance(second.steps[0], CopyStep)
+    run(pipeline, ctx)
+    assert calls == [1]
+    assert first_result.get() == second_result.get() == 3
+
+
+def test_parallel_duplicates_are_kept():
+    # Neither always runs before the other
+    ctx = DedupContext()
+    pipeline = Pipeline(DedupContext, "dedup")
+    left, left_result = triple_node(ctx, "left")
+    right, right_result = triple_node(ctx, "right")
+    pipeline.root_node >> left
+    pipeline.root_node >> right
+    pipeline.build(deduplicate=True)
+
+    assert pipeline.deduplicated_steps == []
+    run(pipeline, ctx)
+    assert calls == [1, 1]
+    assert left_result.get() == right_result.get() == 3
+
+
+def test_duplicate_after_a_conditional_ancestor_is_kept():
+    # The ancestor may be pruned while the duplicate still runs through another path
+    ctx = DedupContext()
+    pipeline = Pipeline(DedupContext, "dedup")
+    conditional, _ = triple_node(ctx, "conditional")
+    conditional | (lambda: False)
+    duplicate, duplicate_result = triple_node(ctx, "duplicate")
+    pipeline.root_node >> conditional >> duplicate
+    pipeline.root_node >> duplicate
+    pipeline.build(deduplicate=True)
+
+    assert pipeline.deduplicated_steps == []
+    run(pipeline, ctx)
+    assert duplicate_result.get() == 3
+
+
+def test_duplicate_after_a_rewritten_input_is_kept():
+    ctx = DedupContext()
+    pipeline = Pipeline(DedupContext, "dedup")
+    first, first_result = triple_node(ctx, "first")
+    rewrite = PipeNode("rewrite").add_steps(
+        AddOneStep(ctx.value.as_output(), None, "", ctx.shifted)
+    )
+    second, second_result = triple_node(ctx, "second")
+    pipeline.root_node >> first >> rewrite >> second
+    pipeline.build(deduplicate=True)
+
+    assert pipeline.deduplicated_steps == []
+    run(pipeline, ctx)
+    assert first_result.get() == 3
+    assert second_result.get() == 18
@@ -0,0 +1,92 @@
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.distributed import Coordinator
+from tuyaux.pipeline import PipeNode, Pipeline
+from tuyaux.steps import FuncStep, StatusEnum
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(signal, "SIGSTOP"), reason="Workers are stopped with POSIX signals"
+)
+
+
+def sleep_pid(value: int, duration: float) -> int:
+    # The worker process the step ran on
+    time.sleep(duration)
+    return os.getpid()
+
+
+SleepPidStep = FuncStep.new(sleep_pid)
+
+
+@dataclass
+class DistributedContext(BasePipelineContext):
+    value: PipeVar[int] = PipeVar.new_field(0)
+
+
+def build_pipeline(
+    coordinator: Coordinator, ctx: DistributedContext, width: int, duration: float
+) -> tuple[Pipeline, list[PipeVar]]:
+    pipeline = Pipeline(DistributedContext, "distributed")
+    pipeline.backend = coordinator
+    pids = [PipeVar(0) for _ in range(width)]
+    for i, pid in enumerate(pids):
+        pipeline.root_node >> PipeNode(f"node {i}").add_steps(
+            SleepPidStep(pid.as_output(), None, "", ctx.value, duration)
+        )
+    pipeline.build(check_io=False)
+    return pipeline, pids
+
+
+def stop_workers(workers: list):
+    for worker in workers:
+        if worker.poll() is None:
+            worker.kill()
+        worker.wait(5)
+
+
+def test_task_of_a_lost_worker_is_reassigned():
+    with Coordinator(heartbeat_timeout=1.0) as coordinator:
+        workers = coordinator.spawn_local_workers(2, heartbeat_interval=0.1)
+        try:
+            assert coordinator.wait_for_workers(2, 30)
+            ctx = DistributedContext(thread_count=4)
+            pipeline, pids = build_pipeline(coordinator, ctx, 4, 0.5)
+            killer = threading.Timer(0.2, workers[0].kill)
+            killer.start()
+            pipeline.execute(ctx)
+            killer.join()
+
+            assert pipeline.runtime_error is None
+            assert all(node.status is StatusEnum.COMPLETE for node in pipeline.nodes)
+            # Every node ended on the surviving worker, its tasks included
+            assert {pid.get() for pid in pids} == {workers[1].pid}
+        finally:
+            stop_workers(workers)
+
+
+def test_idle_worker_loss_is_noticed():
+    with Coordinator(heartbeat_timeout=0.5) as coordinator:
+        workers = coordinator.spawn_local_workers(2, heartbeat_interval=0.1)
+        try:
+            assert coordinator.wait_for_workers(2, 30)
+            # Stopped, not killed: the connection stays open but heartbeats stop
+            os.kill(workers[0].pid, signal.SIGSTOP)
+            deadline = time.monotonic() + 5
+            while coordinator.worker_count > 1 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert coordinator.worker_count == 1
+
+            ctx = DistributedContext(thread_count=2)
+            pipeline, pids = build_pipeline(coordinator, ctx, 1, 0.0)
+            pipeline.execute(ctx)
+            assert pipeline.runtime_error is None
+            assert pids[0].get() == workers[1].pid
+        finally:
+            stop_workers(workers)
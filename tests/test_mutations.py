@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+
+import pytest
+
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.exceptions import (
+    CycleError,
+    GraphMutationError,
+    InputOutputConflictError,
+)
+from tuyaux.pipeline import PipeNode, Pipeline
+from tuyaux.steps import FuncStep, StatusEnum
+
+
+def add_one(value: int) -> int:
+    return value + 1
+
+
+AddOneStep = FuncStep.new(add_one)
+
+
+@dataclass
+class MutationContext(BasePipelineContext):
+    value: PipeVar[int] = PipeVar.new_field(1)
+    shared: PipeVar[int] = PipeVar.new_field(0)
+    result: PipeVar[int] = PipeVar.new_field(0)
+
+
+def add_node(name: str, output: PipeVar, value: PipeVar) -> PipeNode:
+    return PipeNode(name).add_steps(
+        AddOneStep(output.as_output(), None, "", value.as_input())
+    )
+
+
+def snapshot(pipeline: Pipeline) -> dict:
+    return {
+        node: (
+            frozenset(node.parent_nodes),
+            frozenset(node.child_nodes),
+            frozenset(node.branch),
+        )
+        for node in pipeline.nodes
+    }
+
+
+def build_pipeline(
+    deduplicate: bool = False,
+) -> tuple[Pipeline, MutationContext, dict[str, PipeNode]]:
+    # root -> writer -> reader -> final, with a second path root -> reader
+    ctx = MutationContext()
+    pipeline = Pipeline(MutationContext, "mutations")
+    writer = add_node("writer", ctx.shared, ctx.value)
+    reader = add_node("reader", ctx.result, ctx.shared)
+    pipeline.root_node >> writer >> reader
+    pipeline.root_node >> reader
+    pipeline.build(deduplicate=deduplicate)
+    return pipeline, ctx, {"writer": writer, "reader": reader}
+
+
+def test_io_conflict_leaves_the_graph_unchanged():
+    pipeline, ctx, nodes = build_pipeline()
+    before = snapshot(pipeline)
+    # The reader would run in parallel with the writer of its input
+    with pytest.raises(InputOutputConflictError):
+        pipeline.remove_edge(nodes["writer"], nodes["reader"])
+    assert snapshot(pipeline) == before
+
+    pipeline.execute(ctx)
+    assert pipeline.runtime_error is None
+    assert ctx.result.get() == 3
+
+
+def test_cycle_leaves_the_graph_unchanged():
+    pipeline, ctx, nodes = build_pipeline()
+    before = snapshot(pipeline)
+    with pytest.raises(CycleError):
+        pipeline.insert_node(
+            add_node("loop", PipeVar(0), ctx.value),
+            [nodes["reader"]],
+            [nodes["writer"]],
+        )
+    with pytest.raises(CycleError):
+        pipeline.insert_edge(nodes["reader"], nodes["writer"])
+    assert snapshot(pipeline) == before
+
+
+def test_unreachable_nodes_leave_the_graph_unchanged():
+    pipeline, _, nodes = build_pipeline()
+    pipeline.remove_edge(pipeline.root_node, nodes["reader"])
+    before = snapshot(pipeline)
+    with pytest.raises(GraphMutationError):
+        pipeline.remove_node(nodes["writer"])
+    with pytest.raises(GraphMutationError):
+        pipeline.remove_edge(nodes["writer"], nodes["reader"])
+    assert snapshot(pipeline) == before
+
+
+def test_deduplicated_steps_leave_the_graph_unchanged():
+    ctx = MutationContext()
+    pipeline = Pipeline(MutationContext, "mutations")
+    canonical = add_node("canonical", PipeVar(0), ctx.value)
+    middle = add_node("middle", ctx.shared, ctx.value)
+    duplicate = add_node("duplicate", PipeVar(0), ctx.value)
+    pipeline.root_node >> canonical >> middle >> duplicate
+    pipeline.root_node >> middle
+    pipeline.root_node >> duplicate
+    pipeline.build(deduplicate=True, check_io=False)
+    assert pipeline.deduplicated_steps
+    before = snapshot(pipeline)
+
+    with pytest.raises(GraphMutationError):
+        pipeline.remove_node(canonical)
+    with pytest.raises(GraphMutationError):
+        pipeline.remove_edge(middle, duplicate)
+    # Rewrites the input of the canonical step before the copy
+    with pytest.raises(GraphMutationError):
+        pipeline.insert_node(
+            add_node("rewrite", ctx.value, ctx.shared), [canonical], [middle]
+        )
+    assert snapshot(pipeline) == before
+
+    pipeline.execute(ctx)
+    assert pipeline.runtime_error is None
+    assert ctx.shared.get() == 2
+
+
+def test_accepted_mutations_run():
+    pipeline, ctx, nodes = build_pipeline()
+    after = add_node("after", PipeVar(0), ctx.result)
+    pipeline.insert_node(after, [nodes["reader"]])
+    pipeline.remove_edge(pipeline.root_node, nodes["reader"])
+    pipeline.execute(ctx)
+    assert pipeline.runtime_error is None
+    assert after.status is StatusEnum.COMPLETE
+    assert ctx.result.get() == 3
@@ -0,0 +1,60 @@
+import threading
+from dataclasses import dataclass
+
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.observers import NodeObserver
+from tuyaux.pipeline import PipeNode, Pipeline
+from tuyaux.profiling import MemoryProfiler
+from tuyaux.steps import BaseStep, FuncStep, StatusEnum
+
+
+def add_one(value: int) -> int:
+    return value + 1
+
+
+AddOneStep = FuncStep.new(add_one)
+
+
+@dataclass
+class ObserverContext(BasePipelineContext):
+    value: PipeVar[int] = PipeVar.new_field(0)
+
+
+class FailingObserver(NodeObserver):
+    def __init__(self) -> None:
+        self.fail = True
+
+    def step_started(self, node: PipeNode, step: BaseStep):
+        if self.fail:
+            raise RuntimeError("observer failure")
+
+
+def test_failing_observer_releases_the_profiler():
+    ctx = ObserverContext()
+    pipeline = Pipeline(ObserverContext, "observed")
+    for i in range(3):
+        pipeline.root_node >> PipeNode(f"node {i}").add_steps(
+            AddOneStep(PipeVar(0).as_output(), None, "", ctx.value)
+        )
+    pipeline.build()
+    profiler = MemoryProfiler()
+    failing = FailingObserver()
+    pipeline.observers.extend((profiler, failing))
+
+    def run():
+        pipeline.execute(ctx)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert isinstance(pipeline.runtime_error, RuntimeError)
+
+    # The exclusive lock of the profiler was released: later runs still complete
+    failing.fail = False
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert pipeline.runtime_error is None
+    assert pipeline.final_node.status is StatusEnum.COMPLETE
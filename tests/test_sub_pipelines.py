@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+
+import pytest
+
+from tuyaux.context import BasePipelineContext, PipeVar
+from tuyaux.exceptions import SubPipelineError
+from tuyaux.pipeline import PipeNode, Pipeline
+from tuyaux.serialization import load_pipeline, save_pipeline
+from tuyaux.steps import FuncStep, StatusEnum
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+AddStep = FuncStep.new(add)
+
+
+@dataclass
+class InnerContext(BasePipelineContext):
+    x: PipeVar[int] = PipeVar.new_field(0)
+    y: PipeVar[int] = PipeVar.new_field(0)
+
+
+@dataclass
+class OuterContext(BasePipelineContext):
+    value: PipeVar[int] = PipeVar.new_field(10)
+    result: PipeVar[int] = PipeVar.new_field(0)
+
+
+def build_pipelines() -> tuple[Pipeline, Pipeline, OuterContext]:
+    inner_ctx = InnerContext()
+    inner = Pipeline(InnerContext, "inner")
+    inner.root_node >> PipeNode("add").add_steps(
+        AddStep(inner_ctx.y.as_output(), None, "", inner_ctx.x, 1)
+    )
+    # Also usable on its own until it is inlined
+    inner.build()
+    ctx = OuterContext()
+    outer = Pipeline(OuterContext, "outer")
+    outer.root_node >> inner.as_node(
+        "sub", inputs={inner_ctx.x: ctx.value}, outputs={inner_ctx.y: ctx.result}
+    )
+    outer.build()
+    return outer, inner, ctx
+
+
+def test_sub_pipeline_runs_inlined():
+    outer, _, ctx = build_pipelines()
+    outer.execute(ctx)
+    assert outer.runtime_error is None
+    assert ctx.result.get() == 11
+
+
+def test_embedded_pipeline_cannot_run_on_its_own():
+    _, inner, _ = build_pipelines()
+    with pytest.raises(SubPipelineError):
+        inner.execute(InnerContext())
+    with pytest.raises(SubPipelineError):
+        inner.build()
+
+
+def test_save_and_load_with_sub_pipeline(tmp_path):
+    outer, _, ctx = build_pipelines()
+    path = tmp_path / "outer.pkl"
+    save_pipeline(outer, ctx, path)
+    loaded, loaded_ctx = load_pipeline(path)
+    loaded.execute(loaded_ctx)
+    assert loaded.runtime_error is None
+    assert loaded.final_node.status is StatusEnum.COMPLETE
+    assert loaded_ctx.result.get() == 11
@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from tuyaux.cancellation import CancelToken
+from tuyaux.observers import NodeObserver
+from tuyaux.pipeline import DEFAULT_RESOURCE_CLASS
+from tuyaux.steps import BaseStep
+
+if TYPE_CHECKING:
+    from tuyaux.pipeline import PipeNode, Pipeline
+
+
+@dataclass
+class SizingDecision:
+    time: float
+    previous_limit: int
+    limit: int
+    # Share of the wall time of the steps not spent on their thread's CPU
+    blocking_ratio: float
+    # Steps completed per second during the window
+    throughput: float
+    reason: str
+
+
+class AdaptiveConcurrency(NodeObserver):
+    # Limits how many nodes of the default resource class run at once and adapts the
+    # limit to the steps, between min_workers and max_workers:
+    #   pipeline.use_adaptive_concurrency(AdaptiveConcurrency(1, 64))
+    # After every window the limit moves towards cores / (1 - blocking ratio), at
+    # most doubling or halving. A change that lowered the throughput is reverted
+    # and the limit is held for a window: under the GIL, CPU bound steps waiting
+    # for the GIL look blocked.
+
+    def __init__(
+        self,
+        min_workers: int = 1,
+        max_workers: int = 32,
+        window: float = 1.0,
+        initial_workers: Optional[int] = None,
+        tolerance: float = 0.05,
+    ) -> None:
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.window = window
+        self.tolerance = tolerance
+        self.cores = os.cpu_count() or 1
+        self.limit = _clamp(
+            initial_workers or self.cores, self.min_workers, self.max_workers
+        )
+        self.decisions: list[SizingDecision] = []
+        self._condition = threading.Condition()
+        self._active = 0
+        self._step_starts: dict[int, float] = {}
+        self._previous: Optional[SizingDecision] = None
+        self._hold = False
+        self._reset_window()
+
+    def acquire(self, cancel_token: CancelToken) -> bool:
+        with self._condition:
+            while self._active >= self.limit:
+                if cancel_token.cancelled:
+                    return False
+                # Woken up by releases, cancellation is only polled
+                self._condition.wait(0.1)
+            self._active += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def step_started(self, node: "PipeNode", step: BaseStep):
+        # Only the steps of the limited nodes are measured
+        if node.resource_class != DEFAULT_RESOURCE_CLASS:
+            return
+        cpu_start = time.thread_time()
+        with self._condition:
+            self._step_starts[threading.get_ident()] = cpu_start
+
+    def step_finished(self, node: "PipeNode", step: BaseStep, duration: float):
+        if node.resource_class != DEFAULT_RESOURCE_CLASS:
+            return
+        cpu_end = time.thread_time()
+        with self._condition:
+            cpu_start = self._step_starts.pop(threading.get_ident(), cpu_end)
+            self._cpu_time += cpu_end - cpu_start
+            self._wall_time += duration
+            self._steps += 1
+            if time.monotonic() - self._window_start >= self.window:
+                self._resize()
+
+    def run_finished(self, pipeline: "Pipeline", workers: int):
+        with self._condition:
+            self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._cpu_time = 0.0
+        self._wall_time = 0.0
+        self._steps = 0
+
+    def _resize(self):
+        now = time.monotonic()
+        throughput = self._steps / (now - self._window_start)
+        blocking_ratio = (
+            _clamp(1 - self._cpu_time / self._wall_time, 0.0, 1.0)
+            if self._wall_time
+            else 0.0
+        )
+        previous = self._previous
+
+        if self._hold:
+            limit = self.limit
+            reason = "hold after a revert"
+            self._hold = False
+        elif (
+            previous is not None
+            and previous.limit != previous.previous_limit
+            and throughput < previous.throughput * (1 - self.tolerance)
+        ):
+            limit = previous.previous_limit
+            reason = "revert, the throughput dropped"
+            self._hold = True
+        else:
+            target = round(self.cores / max(1 - blocking_ratio, 1 / self.max_workers))
+            limit = _clamp(target, self.limit // 2, self.limit * 2)
+            reason = f"target of {target} workers"
+        limit = _clamp(limit, self.min_workers, self.max_workers)
+
+        decision = SizingDecision(
+            now, self.limit, limit, blocking_ratio, throughput, reason
+        )
+        self.decisions.append(decision)
+        self._previous = decision
+        if limit != self.limit:
+            logging.info(
+                f"Concurrency {self.limit} -> {limit} ({reason}, blocking ratio "
+                f"{blocking_ratio:.2f}, {throughput:.1f} steps/s)"
+            )
+            self.limit = limit
+            self._condition.notify_all()
+        self._reset_window()
+
+
+def _clamp(value, low, high):
+    return max(low, min(value, high))
@@ -0,0 +1,110 @@
+import pickle
+import sys
+import threading
+import types
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from tuyaux.context import BasePipelineContext
+from tuyaux.steps import BaseStep, FuncStep
+
+try:
+    from concurrent.futures import InterpreterPoolExecutor  # type: ignore
+except ImportError:
+    InterpreterPoolExecutor = None
+
+if TYPE_CHECKING:
+    from tuyaux.pipeline import PipeNode
+
+# Free-threaded builds already run the worker threads of a pipeline in parallel
+FREE_THREADED = not getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+class ExecutionBackend:
+    # Runs the steps of a node once the scheduler decided it must run. The default
+    # implementation runs them in the calling worker thread.
+
+    def run_steps(self, node: "PipeNode", ctx: BasePipelineContext):
+        node.run_steps(ctx)
+
+    def run_step(self, node: "PipeNode", step: BaseStep, ctx: BasePipelineContext):
+        step.run(ctx)
+
+
+class InterpreterBackend(ExecutionBackend):
+    # Runs the functions of FuncSteps in a pool of subinterpreters, each with its
+    # own GIL, so that CPU bound steps use several cores:
+    #   pipeline.backend = InterpreterBackend()
+    # The node keeps its worker thread while the function runs, so the pipeline
+    # thread_count should be at least max_workers. Functions must be importable
+    # module level functions and their arguments picklable, other steps run in the
+    # worker thread. On free-threaded builds, or before Python 3.14, every step
+    # runs in the worker thread.
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def uses_interpreters(self) -> bool:
+        return InterpreterPoolExecutor is not None and not FREE_THREADED
+
+    def run_step(self, node: "PipeNode", step: BaseStep, ctx: BasePipelineContext):
+        if not (
+            self.uses_interpreters
+            and isinstance(step, FuncStep)
+            and _importable(step.function)
+        ):
+            step.run(ctx)
+            return
+
+        args, kwargs = step.arguments()
+        try:
+            pickle.dumps((args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            step.run(ctx)
+            return
+
+        future = self._get_executor().submit(step.function, *args, **kwargs)
+        while True:
+            try:
+                results = future.result(timeout=0.1)
+                break
+            except TimeoutError:
+                if step.cancel_token.cancelled:
+                    # A running interpreter cannot be interrupted, it is left to end
+                    future.cancel()
+                    step.cancel_token.raise_if_cancelled()
+        step.set_results(results)
+        step.completed()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = InterpreterPoolExecutor(
+                    self.max_workers, thread_name_prefix="tuyaux-interpreter"
+                )
+            return self._executor
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self) -> "InterpreterBackend":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+def _importable(func: Callable[..., Any]) -> bool:
+    # Subinterpreters import the function by name, closures and functions of the
+    # main script cannot be found
+    return (
+        isinstance(func, types.FunctionType)
+        and func.__module__ != "__main__"
+        and "<locals>" not in func.__qualname__
+    )
@@ -0,0 +1,40 @@
+import threading
+from typing import Optional
+
+from tuyaux.exceptions import PipelineCancelledError
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self.reason: Optional[BaseException] = None
+
+    def cancel(self, reason: Optional[BaseException] = None):
+        # Only the first reason is kept when several threads cancel at once
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise PipelineCancelledError(
+                f"The execution was cancelled: {self.reason!r}"
+            )
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # Interruptible replacement for time.sleep in long running steps
+        return self._event.wait(timeout)
+
+    def __reduce__(self):
+        # A token only makes sense for the run it was created for
+        return (self.__class__, ())
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(cancelled={self.cancelled})"
@@ -127,3 +127,12 @@ class BasePipelineContext:
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self._thread_lock.release()
         return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_thread_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._thread_lock = Lock()
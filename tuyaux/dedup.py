@@ -0,0 +1,180 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Hashable, Optional
+
+from tuyaux.context import InVar, PipeVar
+from tuyaux.steps import BaseStep, CopyStep, FuncStep
+
+if TYPE_CHECKING:
+    from tuyaux.pipeline import PipeNode, Pipeline
+
+
+@dataclass
+class DeduplicatedStep:
+    node: str
+    step: str
+    # The step that still runs the function, its results are copied
+    canonical_node: str
+    canonical_step: str
+
+
+class _Occurrence:
+    def __init__(self, node: "PipeNode", index: int, step: FuncStep) -> None:
+        self.node = node
+        self.index = index
+        self.step = step
+
+
+def deduplicate_steps(pipeline: "Pipeline") -> list[DeduplicatedStep]:
+    # Function steps calling the same function with the same variables and constants
+    # compute the same results when the function is pure. A duplicate is replaced by
+    # a copy of the results of the first step when that step always ran before it
+    # and read the same values:
+    # - it is in the same node or in an ancestor that has no conditions, nor any
+    #   ancestor with conditions, and is not optional: it cannot be skipped while
+    #   the duplicate runs
+    # - the input variables are only written by ancestors of its node or by the
+    #   steps before it in its node
+    # - its output variables are not written by any other step
+    # Requires the branches computed by build.
+    writers: dict[PipeVar, list[BaseStep]] = defaultdict(list)
+    producers: dict[PipeVar, set["PipeNode"]] = defaultdict(set)
+    groups: dict[Hashable, list[_Occurrence]] = defaultdict(list)
+    for node in pipeline.nodes:
+        for index, step in enumerate(node.steps):
+            for var in step.outputs():
+                writers[var.as_pipevar()].append(step)
+                producers[var.as_pipevar()].add(node)
+            if not isinstance(step, FuncStep):
+                continue
+            key = _step_key(step)
+            if key is not None:
+                groups[key].append(_Occurrence(node, index, step))
+
+    deduplicated: list[DeduplicatedStep] = []
+    for occurrences in groups.values():
+        if len(occurrences) < 2:
+            continue
+        # Ancestors have fewer ancestors than their descendants
+        occurrences.sort(key=lambda occ: (len(occ.node.branch), occ.index))
+        canonicals: list[_Occurrence] = []
+        for occurrence in occurrences:
+            canonical = next(
+                (
+                    candidate
+                    for candidate in canonicals
+                    if candidate.node is occurrence.node
+                    or candidate.node in occurrence.node.branch
+                ),
+                None,
+            )
+            if canonical is None:
+                if _can_be_canonical(occurrence, writers, producers):
+                    canonicals.append(occurrence)
+                continue
+            _replace(occurrence, canonical)
+            deduplicated.append(
+                DeduplicatedStep(
+                    occurrence.node.name,
+                    occurrence.step.name,
+                    canonical.node.name,
+                    canonical.step.name,
+                )
+            )
+
+    if deduplicated:
+        logging.info(
+            f"{len(deduplicated)} duplicate steps of {pipeline.name} were replaced "
+            "by copies"
+        )
+    return deduplicated
+
+
+def _step_key(step: FuncStep) -> Optional[Hashable]:
+    # Steps using resources have side effects
+    if step.required_resources():
+        return None
+    try:
+        key = (
+            # One class is generated per function
+            type(step),
+            len(step.outputs()),
+            tuple(_argument_key(arg) for arg in step.args),
+            tuple(
+                sorted((name, _argument_key(arg)) for name, arg in step.kwargs.items())
+            ),
+        )
+        hash(key)
+    except TypeError:
+        # Unhashable constants are never compared
+        return None
+    return key
+
+
+def _argument_key(arg: Any) -> tuple:
+    match arg:
+        case InVar():
+            return ("var", arg.as_pipevar())
+        case PipeVar():
+            return ("var", arg)
+        case _:
+            # 1, 1.0 and True are equal but not interchangeable
+            return ("constant", type(arg), arg)
+
+
+def _can_be_canonical(
+    occurrence: _Occurrence,
+    writers: dict[PipeVar, list[BaseStep]],
+    producers: dict[PipeVar, set["PipeNode"]],
+) -> bool:
+    node = occurrence.node
+    if node.optional or node.conditions:
+        return False
+    if any(ancestor.conditions for ancestor in node.branch):
+        return False
+    step = occurrence.step
+    previous_steps = node.steps[: occurrence.index]
+    for arg in (*step.args, *step.kwargs.values()):
+        if isinstance(arg, InVar):
+            arg = arg.as_pipevar()
+        if not isinstance(arg, PipeVar):
+            continue
+        if not producers.get(arg, set()) - {node} <= node.branch:
+            return False
+        if node in producers.get(arg, ()) and any(
+            writer in node.steps and writer not in previous_steps
+            for writer in writers[arg]
+        ):
+            return False
+    return all(
+        writers[var.as_pipevar()] == [occurrence.step]
+        for var in occurrence.step.outputs()
+    )
+
+
+def step_variables(step: BaseStep) -> set[PipeVar]:
+    # Read or written by a canonical step: other nodes must not write them
+    variables = {var.as_pipevar() for var in step.outputs()}
+    if isinstance(step, FuncStep):
+        for arg in (*step.args, *step.kwargs.values()):
+            if isinstance(arg, InVar):
+                variables.add(arg.as_pipevar())
+            elif isinstance(arg, PipeVar):
+                variables.add(arg)
+    return variables
+
+
+def _replace(occurrence: _Occurrence, canonical: _Occurrence):
+    node = occurrence.node
+    node.steps[occurrence.index] = CopyStep(
+        (
+            (source.as_pipevar().as_input(), target)
+            for source, target in zip(
+                canonical.step.outputs(), occurrence.step.outputs()
+            )
+        ),
+        name=occurrence.step.name,
+        comment=f"Copy of {canonical.step.name} in {canonical.node.name}",
+    )
+    node.inputs = {var.as_pipevar() for step in node.steps for var in step.inputs()}
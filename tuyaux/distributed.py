@@ -0,0 +1,394 @@
+import itertools
+import logging
+import os
+import pickle
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Optional
+
+from tuyaux.backends import ExecutionBackend
+from tuyaux.cancellation import CancelToken
+from tuyaux.context import BasePipelineContext, NoDefault, PipeVar
+from tuyaux.exceptions import (
+    NoDefaultError,
+    PipelineCancelledError,
+    RemoteStepError,
+    WorkerLostError,
+)
+from tuyaux.messages import picklable_error, recv_message, send_message
+from tuyaux.steps import BaseStep, StatusEnum
+
+if TYPE_CHECKING:
+    from tuyaux.pipeline import PipeNode
+
+
+def _apply_step_status(step: BaseStep, status: StatusEnum, error: Any):
+    match status:
+        case StatusEnum.COMPLETE:
+            step.completed()
+        case StatusEnum.SKIPPED:
+            step.skipped()
+        case StatusEnum.CANCELLED:
+            step.cancelled(error)
+        case StatusEnum.ERROR:
+            step.errored(error)
+        case _:
+            step.unknown()
+
+
+class _Task:
+    def __init__(self, task_id: int, payload: bytes, node: "PipeNode") -> None:
+        self.id = task_id
+        self.payload = payload
+        self.node = node
+        self.future: Future[tuple] = Future()
+        self.attempts = 0
+        self.cancel_requested = False
+
+
+class _Connection:
+    def __init__(self, worker_id: str, sock: socket.socket) -> None:
+        self.worker_id = worker_id
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        # Results read from the worker, None once the connection is lost
+        self.results: queue.Queue[Optional[tuple]] = queue.Queue()
+        self.lost = threading.Event()
+
+
+class Coordinator(ExecutionBackend):
+    # Sends the nodes scheduled by Pipeline.execute to remote workers:
+    #   pipeline.backend = Coordinator()
+    # Each remote node keeps a local worker thread busy while it runs, so the
+    # pipeline thread_count should be at least the number of remote workers.
+    # Messages are pickled: coordinator and workers must only be exposed to trusted
+    # hosts.
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        heartbeat_timeout: float = 5.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self._tasks: queue.Queue[Optional[_Task]] = queue.Queue()
+        self._task_ids = itertools.count()
+        self._workers: dict[str, _Connection] = {}
+        self._workers_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._server = socket.create_server((host, port))
+        self.address: tuple[str, int] = self._server.getsockname()[:2]
+        threading.Thread(
+            target=self._accept, name="tuyaux-coordinator", daemon=True
+        ).start()
+        threading.Thread(
+            target=self._monitor, name="tuyaux-coordinator-monitor", daemon=True
+        ).start()
+
+    @property
+    def worker_count(self) -> int:
+        with self._workers_lock:
+            return len(self._workers)
+
+    def wait_for_workers(self, count: int, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.worker_count < count:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def spawn_local_workers(
+        self, count: int, heartbeat_interval: float = 1.0
+    ) -> list[subprocess.Popen]:
+        # Workers inherit the import path of the coordinator to find the step code
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        host, port = self.address
+        return [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "tuyaux.distributed",
+                    host,
+                    str(port),
+                    str(heartbeat_interval),
+                ],
+                env=env,
+            )
+            for _ in range(count)
+        ]
+
+    def run_steps(self, node: "PipeNode", ctx: BasePipelineContext):
+        # The context is sent with the node so that the steps get their inputs,
+        # only the declared outputs of the node are sent back
+        outputs = list(node.outputs)
+        payload = pickle.dumps((ctx, node, outputs), protocol=pickle.HIGHEST_PROTOCOL)
+        task = _Task(next(self._task_ids), payload, node)
+        self._tasks.put(task)
+
+        while True:
+            try:
+                status, error, values, step_results = task.future.result(
+                    timeout=min(self.heartbeat_timeout, 0.1)
+                )
+                break
+            except TimeoutError:
+                if not node.cancel_token.cancelled:
+                    continue
+                if task.future.cancel():
+                    # Never sent to a worker
+                    status, error, values, step_results = (
+                        StatusEnum.CANCELLED,
+                        node.cancel_token.reason,
+                        [],
+                        [],
+                    )
+                    break
+                task.cancel_requested = True
+            except WorkerLostError as e:
+                status, error, values, step_results = StatusEnum.ERROR, e, [], []
+                break
+
+        for var, value in zip(outputs, values):
+            if value is not NoDefault:
+                var.set(value)
+        for step, (step_status, step_error) in zip(node.steps, step_results):
+            _apply_step_status(step, step_status, step_error)
+        node.finish(status, error)
+
+    def close(self):
+        self._closed.set()
+        with self._workers_lock:
+            workers = list(self._workers.values())
+        for _ in workers:
+            self._tasks.put(None)
+        self._server.close()
+
+    def __enter__(self) -> "Coordinator":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=self._serve_worker,
+                args=(sock, f"{address[0]}:{address[1]}"),
+                name=f"tuyaux-coordinator-{address[1]}",
+                daemon=True,
+            ).start()
+
+    def _monitor(self):
+        # Workers send heartbeats, silence for longer than the timeout means death,
+        # whether they run a task or not
+        while not self._closed.wait(min(self.heartbeat_timeout / 4, 0.1)):
+            now = time.monotonic()
+            with self._workers_lock:
+                silent = [
+                    connection
+                    for connection in self._workers.values()
+                    if now - connection.last_seen > self.heartbeat_timeout
+                ]
+            for connection in silent:
+                logging.warning(f"Worker {connection.worker_id} stopped answering")
+                connection.lost.set()
+                try:
+                    # Unblocks the reader of the connection
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def _read_worker(self, connection: _Connection):
+        try:
+            while True:
+                message = recv_message(connection.sock)
+                connection.last_seen = time.monotonic()
+                if message[0] == "result":
+                    connection.results.put(message)
+        except (OSError, ConnectionError, pickle.UnpicklingError):
+            connection.lost.set()
+            connection.results.put(None)
+
+    def _next_task(self, connection: _Connection) -> Optional[_Task]:
+        while True:
+            try:
+                return self._tasks.get(timeout=0.1)
+            except queue.Empty:
+                if connection.lost.is_set():
+                    raise ConnectionError("The worker was lost while idle")
+
+    def _serve_worker(self, sock: socket.socket, worker_id: str):
+        sock.settimeout(self.heartbeat_timeout)
+        try:
+            recv_message(sock)
+        except (OSError, ConnectionError, pickle.UnpicklingError):
+            sock.close()
+            return
+        # The monitor thread checks the heartbeats from now on
+        sock.settimeout(None)
+        connection = _Connection(worker_id, sock)
+        with self._workers_lock:
+            self._workers[worker_id] = connection
+        logging.info(f"Worker {worker_id} connected")
+        threading.Thread(
+            target=self._read_worker,
+            args=(connection,),
+            name=f"tuyaux-coordinator-reader-{worker_id}",
+            daemon=True,
+        ).start()
+
+        send_lock = connection.send_lock
+        task: Optional[_Task] = None
+        try:
+            while True:
+                task = self._next_task(connection)
+                if task is None:
+                    send_message(sock, send_lock, ("shutdown",))
+                    return
+                if (
+                    task.attempts == 0
+                    and not task.future.set_running_or_notify_cancel()
+                ):
+                    continue
+                task.attempts += 1
+                send_message(sock, send_lock, ("task", task.id, task.payload))
+                cancel_sent = False
+                while True:
+                    try:
+                        message = connection.results.get(timeout=0.1)
+                    except queue.Empty:
+                        message = ()
+                    if message is None:
+                        raise ConnectionError("The worker was lost during a task")
+                    if task.cancel_requested and not cancel_sent:
+                        send_message(sock, send_lock, ("cancel", task.id))
+                        cancel_sent = True
+                    if message and message[1] == task.id:
+                        task.future.set_result(message[2])
+                        task = None
+                        break
+        except (OSError, ConnectionError, pickle.UnpicklingError) as e:
+            logging.warning(f"Worker {worker_id} lost: {e!r}")
+            if task is not None and not task.future.done():
+                if task.attempts < self.max_attempts and not self._closed.is_set():
+                    # Reassigned to the next available worker
+                    self._tasks.put(task)
+                else:
+                    task.future.set_exception(
+                        WorkerLostError(
+                            f"{task.node.name} was lost by {task.attempts} workers"
+                        )
+                    )
+        finally:
+            with self._workers_lock:
+                self._workers.pop(worker_id, None)
+            sock.close()
+
+
+class Worker:
+    def __init__(self, host: str, port: int, heartbeat_interval: float = 1.0) -> None:
+        self.address = (host, port)
+        self.heartbeat_interval = heartbeat_interval
+        self._send_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._cancel_tokens: dict[int, CancelToken] = {}
+
+    def serve(self):
+        with socket.create_connection(self.address) as sock:
+            send_message(sock, self._send_lock, ("hello", os.getpid()))
+            threading.Thread(
+                target=self._heartbeat,
+                args=(sock,),
+                name="tuyaux-heartbeat",
+                daemon=True,
+            ).start()
+            try:
+                while True:
+                    message = recv_message(sock)
+                    match message:
+                        case ("task", task_id, payload):
+                            # Run in a thread so that cancel requests are still read
+                            threading.Thread(
+                                target=self._run_task,
+                                args=(sock, task_id, payload),
+                                daemon=True,
+                            ).start()
+                        case ("cancel", task_id):
+                            token = self._cancel_tokens.get(task_id)
+                            if token is not None:
+                                token.cancel(
+                                    PipelineCancelledError("Cancelled by coordinator")
+                                )
+                        case ("shutdown",):
+                            return
+            except ConnectionError:
+                return
+            finally:
+                self._stopped.set()
+
+    def _heartbeat(self, sock: socket.socket):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                send_message(sock, self._send_lock, ("heartbeat",))
+            except OSError:
+                return
+
+    def _run_task(self, sock: socket.socket, task_id: int, payload: bytes):
+        try:
+            result = self._execute(task_id, payload)
+            send_message(sock, self._send_lock, ("result", task_id, result))
+        except OSError:
+            return
+        except Exception as e:
+            # The coordinator must always get an answer, e.g. when the step code
+            # cannot be imported or the outputs cannot be pickled
+            error = RemoteStepError(f"The task failed on worker {os.getpid()}: {e!r}")
+            send_message(
+                sock,
+                self._send_lock,
+                ("result", task_id, (StatusEnum.ERROR, error, [], [])),
+            )
+
+    def _execute(self, task_id: int, payload: bytes) -> tuple:
+        ctx: BasePipelineContext
+        node: "PipeNode"
+        outputs: list[PipeVar]
+        ctx, node, outputs = pickle.loads(payload)
+        self._cancel_tokens[task_id] = node.cancel_token
+        try:
+            node.run_steps(ctx)
+        finally:
+            self._cancel_tokens.pop(task_id, None)
+
+        values: list[Any] = []
+        for var in outputs:
+            try:
+                values.append(var.get())
+            except NoDefaultError:
+                values.append(NoDefault)
+        return (
+            node.status,
+            picklable_error(node.error),
+            values,
+            [(step.status, picklable_error(step.error)) for step in node.steps],
+        )
+
+
+if __name__ == "__main__":
+    # python -m tuyaux.distributed HOST PORT [HEARTBEAT_INTERVAL]
+    host, port, *interval = sys.argv[1:]
+    Worker(host, int(port), *(float(value) for value in interval)).serve()
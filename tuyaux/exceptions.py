@@ -13,5 +13,66 @@ class ConditionError(BasePipelineError):
 class InputOutputConflictError(BasePipelineError):
     pass
 
+
 class CycleError(BasePipelineError):
     pass
+
+
+class ResourceClassError(BasePipelineError):
+    pass
+
+
+class PipelineCancelledError(BasePipelineError):
+    pass
+
+
+class PipelineTimeoutError(BasePipelineError):
+    pass
+
+
+class PipelineSerializationError(BasePipelineError):
+    pass
+
+
+class FingerprintMismatchError(PipelineSerializationError):
+    pass
+
+
+class WorkerLostError(BasePipelineError):
+    pass
+
+
+class RemoteStepError(BasePipelineError):
+    pass
+
+
+class SubPipelineError(BasePipelineError):
+    pass
+
+
+class MemoryBudgetError(BasePipelineError):
+    pass
+
+
+class StepSignatureError(BasePipelineError):
+    pass
+
+
+class TargetError(BasePipelineError):
+    pass
+
+
+class PipelineServerError(BasePipelineError):
+    pass
+
+
+class ResourceError(BasePipelineError):
+    pass
+
+
+class GraphMutationError(BasePipelineError):
+    pass
+
+
+class SimulationError(BasePipelineError):
+    pass
@@ -0,0 +1,43 @@
+import pickle
+import socket
+import struct
+import threading
+from typing import Optional
+
+from tuyaux.exceptions import RemoteStepError
+
+# Length-prefixed pickled tuples, shared by the distributed backend and the server.
+# Messages are pickled: sockets must only be reachable by trusted peers.
+_HEADER = struct.Struct("!I")
+
+
+def send_message(sock: socket.socket, lock: threading.Lock, message: tuple):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    with lock:
+        sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks: list[bytes] = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("The connection was closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock: socket.socket) -> tuple:
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return pickle.loads(_recv_exactly(sock, size))
+
+
+def picklable_error(error: Optional[BaseException]) -> Optional[BaseException]:
+    if error is None:
+        return None
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RemoteStepError(f"{error.__class__.__name__}: {error}")
@@ -0,0 +1,200 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from typing import TYPE_CHECKING, Iterable
+
+from tuyaux.observers import NodeObserver
+from tuyaux.steps import BaseStep, StatusEnum
+
+if TYPE_CHECKING:
+    from tuyaux.pipeline import PipeNode, Pipeline
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[int]:
+        return list(accumulate(self.counts))
+
+
+class PipelineMetrics(NodeObserver):
+    # A single instance can be shared by every pipeline of a process:
+    # pipeline.observers.append(metrics)
+
+    def __init__(
+        self, buckets: Iterable[float] = DEFAULT_BUCKETS, rate_window: float = 60.0
+    ) -> None:
+        self._lock = threading.Lock()
+        self.buckets = tuple(sorted(buckets))
+        self.rate_window = rate_window
+        self.ready_nodes = 0
+        self.running_nodes = 0
+        self.workers = 0
+        self.completed_nodes = 0
+        self.failed_nodes = 0
+        self.step_durations: dict[str, Histogram] = {}
+        self._completions: deque[float] = deque()
+
+    def run_started(self, pipeline: "Pipeline", workers: int):
+        with self._lock:
+            self.workers += workers
+
+    def run_finished(self, pipeline: "Pipeline", workers: int):
+        with self._lock:
+            self.workers -= workers
+
+    def node_queued(self, node: "PipeNode"):
+        with self._lock:
+            self.ready_nodes += 1
+
+    def node_dequeued(self, node: "PipeNode"):
+        with self._lock:
+            self.ready_nodes -= 1
+
+    def node_started(self, node: "PipeNode"):
+        with self._lock:
+            self.running_nodes += 1
+
+    def node_finished(self, node: "PipeNode"):
+        now = time.monotonic()
+        with self._lock:
+            self.running_nodes -= 1
+            if node.status & StatusEnum.OK:
+                self.completed_nodes += 1
+                self._completions.append(now)
+                self._drop_old_completions(now)
+            else:
+                self.failed_nodes += 1
+
+    def step_finished(self, node: "PipeNode", step: BaseStep, duration: float):
+        label = type(step).__name__
+        with self._lock:
+            histogram = self.step_durations.get(label)
+            if histogram is None:
+                histogram = self.step_durations[label] = Histogram(self.buckets)
+            histogram.observe(duration)
+
+    def _drop_old_completions(self, now: float):
+        completions = self._completions
+        while completions and completions[0] < now - self.rate_window:
+            completions.popleft()
+
+    def worker_utilization(self) -> float:
+        with self._lock:
+            return self.running_nodes / self.workers if self.workers else 0.0
+
+    def completion_rate(self) -> float:
+        # Completed nodes per second over the last rate_window seconds
+        with self._lock:
+            self._drop_old_completions(time.monotonic())
+            return len(self._completions) / self.rate_window
+
+    def snapshot(self) -> dict[str, float]:
+        utilization = self.worker_utilization()
+        completion_rate = self.completion_rate()
+        with self._lock:
+            return {
+                "ready_nodes": self.ready_nodes,
+                "running_nodes": self.running_nodes,
+                "workers": self.workers,
+                "worker_utilization": utilization,
+                "completed_nodes": self.completed_nodes,
+                "failed_nodes": self.failed_nodes,
+                "completion_rate": completion_rate,
+            }
+
+    def to_prometheus(self, prefix: str = "tuyaux") -> str:
+        snapshot = self.snapshot()
+        lines: list[str] = []
+        for name, suffix, metric_type, help_ in (
+            ("ready_nodes", "", "gauge", "Nodes waiting for a worker"),
+            ("running_nodes", "", "gauge", "Nodes running their steps"),
+            ("workers", "", "gauge", "Workers of the running pipelines"),
+            ("worker_utilization", "", "gauge", "Ratio of busy workers"),
+            ("completed_nodes", "_total", "counter", "Nodes completed successfully"),
+            ("failed_nodes", "_total", "counter", "Nodes errored or cancelled"),
+            ("completion_rate", "", "gauge", "Nodes completed per second"),
+        ):
+            metric = f"{prefix}_{name}{suffix}"
+            lines.extend(
+                (
+                    f"# HELP {metric} {help_}",
+                    f"# TYPE {metric} {metric_type}",
+                    f"{metric} {snapshot[name]}",
+                )
+            )
+
+        metric = f"{prefix}_step_duration_seconds"
+        lines.extend(
+            (
+                f"# HELP {metric} Duration of the steps per step class",
+                f"# TYPE {metric} histogram",
+            )
+        )
+        with self._lock:
+            for label, histogram in sorted(self.step_durations.items()):
+                step = label.replace("\\", "\\\\").replace('"', '\\"')
+                for bound, count in zip(
+                    (*self.buckets, "+Inf"), histogram.cumulative_counts()
+                ):
+                    lines.append(
+                        f'{metric}_bucket{{step="{step}",le="{bound}"}} {count}'
+                    )
+                lines.append(f'{metric}_sum{{step="{step}"}} {histogram.sum}')
+                lines.append(f'{metric}_count{{step="{step}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(
+    metrics: PipelineMetrics, port: int = 9464, host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    # Serves the Prometheus text format from a daemon thread, stop it with shutdown()
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="tuyaux-metrics", daemon=True
+    ).start()
+    return server
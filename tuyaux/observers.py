@@ -0,0 +1,36 @@
+from typing import TYPE_CHECKING
+
+from tuyaux.steps import BaseStep
+
+if TYPE_CHECKING:
+    from tuyaux.pipeline import PipeNode, Pipeline
+
+
+class NodeObserver:
+    # Hooks called by the pipeline scheduler. Node and step hooks are called from the
+    # worker thread running the node and must stay cheap and thread safe. An
+    # exception raised by step_finished fails the step.
+
+    def run_started(self, pipeline: "Pipeline", workers: int):
+        pass
+
+    def run_finished(self, pipeline: "Pipeline", workers: int):
+        pass
+
+    def node_queued(self, node: "PipeNode"):
+        pass
+
+    def node_dequeued(self, node: "PipeNode"):
+        pass
+
+    def node_started(self, node: "PipeNode"):
+        pass
+
+    def node_finished(self, node: "PipeNode"):
+        pass
+
+    def step_started(self, node: "PipeNode", step: BaseStep):
+        pass
+
+    def step_finished(self, node: "PipeNode", step: BaseStep, duration: float):
+        pass
@@ -1,34 +1,110 @@
 from collections import defaultdict, deque
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
 import pprint
+import queue
 import threading
 from functools import reduce
-from itertools import repeat
+from itertools import compress
+from operator import attrgetter
 import time
-from typing import Callable, Iterable, Optional, Self, TypeAlias, TypeVar, Union
-from tuyaux.exceptions import ConditionError, CycleError, InputOutputConflictError
-from tuyaux.steps import BaseStep, StatusEnum, FinalStep, RootStep
-
-from tuyaux.context import BasePipelineContext, ContextT, PipeVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Self,
+    TypeAlias,
+    TypeVar,
+    Union,
+)
+from tuyaux.backends import ExecutionBackend
+from tuyaux.cancellation import CancelToken
+from tuyaux.exceptions import (
+    ConditionError,
+    CycleError,
+    GraphMutationError,
+    InputOutputConflictError,
+    NoDefaultError,
+    PipelineCancelledError,
+    PipelineSerializationError,
+    PipelineTimeoutError,
+    ResourceClassError,
+    ResourceError,
+    SubPipelineError,
+    TargetError,
+)
+from tuyaux.dedup import DeduplicatedStep, deduplicate_steps, step_variables
+from tuyaux.observers import NodeObserver
+from tuyaux.resources import ResourceRegistry
+from tuyaux.scheduling import get_global_scheduler
+from tuyaux.steps import BaseStep, StatusEnum, FinalStep, RootStep, CopyStep
+
+from tuyaux.context import BasePipelineContext, ContextT, InVar, OutVar, PipeVar
 import logging
 
 # import asyncio
 import graphviz
 
+if TYPE_CHECKING:
+    from tuyaux.adaptive import AdaptiveConcurrency
+
 logging.basicConfig(level=logging.DEBUG)
 
 ConditionExpr = Callable[[], bool]
+NodeCallback = Callable[["PipeNode"], None]
+VarCallback = Callable[[PipeVar, Any], None]
 NodeOrNodeCompT = TypeVar("NodeOrNodeCompT", bound=Union["PipeNode", "NodeComp"])
 
+# Nodes without an explicit resource class run on a pool sized by thread_count
+DEFAULT_RESOURCE_CLASS = "default"
+
+# Status shown for a collapsed group, the first status present wins
+GROUP_STATUS_PRIORITY = (
+    StatusEnum.ERROR,
+    StatusEnum.CANCELLED,
+    StatusEnum.CONDITION_FAILED,
+    StatusEnum.RUNNING,
+    StatusEnum.UNKNOWN,
+    StatusEnum.SKIPPED,
+    StatusEnum.COMPLETE,
+)
+
+# Turns the digits of a binary string into the bytes 0 and 1, for itertools.compress
+_BIT_VALUES = bytes.maketrans(b"01", b"\x00\x01")
+
 
 class PipeNode:
-    def __init__(self, name="Node") -> None:
+    def __init__(
+        self,
+        name="Node",
+        resource_class: str = DEFAULT_RESOURCE_CLASS,
+        timeout: Optional[float] = None,
+        optional: bool = False,
+        estimated_duration: Optional[float] = None,
+    ) -> None:
         self.name = name
+        self.resource_class = resource_class
+        # Seconds after which the whole run is cancelled if the node is still running
+        self.timeout = timeout
+        # Optional nodes are dropped when they cannot finish before the run deadline,
+        # their duration is estimated from the last run when not given
+        self.optional = optional
+        self.estimated_duration = estimated_duration
+        self.last_duration: Optional[float] = None
+        self.cancel_token = CancelToken()
+        self.observers: list[NodeObserver] = []
+        self.backend: Optional[ExecutionBackend] = None
         self.steps: list[BaseStep] = []
         self.parent_nodes: set[PipeNode] = set()
         self.child_nodes: set[PipeNode] = set()
         self._status = StatusEnum.UNKNOWN
         self._error: Optional[BaseException] = None
+        # Status, error and executed flag change together, which the GIL does not
+        # guarantee on its own and free-threaded builds not at all
+        self._state_lock = threading.Lock()
         self._id = id(self)
         self.all_parents_executed: threading.Semaphore
         self.update_run_flag()
@@ -36,6 +112,7 @@ class PipeNode:
         self.conditions: list[ConditionExpr] = []
         self.inputs: set[PipeVar] = set()
         self.outputs: set[PipeVar] = set()
+        self.required_resources: set[str] = set()
         self.branch: set[PipeNode] = set()
 
     def __repr__(self) -> str:
@@ -45,65 +122,181 @@ class PipeNode:
         required = max(len(self.parent_nodes) - 1, 0)
         self.all_parents_executed = threading.Semaphore(required)
 
+    def release(self) -> bool:
+        # Called once by each parent that is done, True for the last one: the node is
+        # then ready to run
+        with self._state_lock:
+            # The status is reset in the same critical section as the release so
+            # that it cannot overwrite the status set by the last parent
+            if self.all_parents_executed.acquire(blocking=False):
+                self._status = StatusEnum.UNKNOWN
+                return False
+        return True
+
     def run(self, ctx: BasePipelineContext):
-        if self.all_parents_executed.acquire(blocking=False):
-            self._status = StatusEnum.UNKNOWN
-            return
+        if self.release():
+            self.run_ready(ctx)
 
+    def run_ready(self, ctx: BasePipelineContext):
         if self.executed:
             return
 
         # If just one condition is false, the step should error out, skip step
-        if not self.check_conditions:
+        if not self.check_conditions():
             self._executed.set()
             return
 
+        self._set_status(StatusEnum.RUNNING)
+        observers = self.observers
+        for observer in observers:
+            observer.node_started(self)
+        try:
+            if self.backend is None:
+                self.run_steps(ctx)
+            else:
+                self.backend.run_steps(self, ctx)
+        finally:
+            for observer in observers:
+                observer.node_finished(self)
+
+    def run_steps(self, ctx: BasePipelineContext):
+        # Hot loop: attributes are read once and statuses compared by identity, the
+        # Flag operators are much slower
+        observers = self.observers
+        cancel_token = self.cancel_token
+        backend = self.backend
         for step in self.steps:
+            # Remaining steps are dropped as soon as the run is cancelled
+            if cancel_token.cancelled:
+                self._set_status(StatusEnum.CANCELLED, cancel_token.reason)
+                return
+            step.cancel_token = cancel_token
+            step.running()
+            start = time.perf_counter()
+            # Only the observers that saw the step start see it finish, e.g. a
+            # profiler holding a lock in between
+            started = 0
             try:
-                step.run(ctx)
-                if not bool(step.status & StatusEnum.OK):
-                    self._status = StatusEnum.ERROR
-                    self._error = step.error
+                try:
+                    for observer in observers:
+                        observer.step_started(self, step)
+                        started += 1
+                    if backend is None:
+                        step.run(ctx)
+                    else:
+                        backend.run_step(self, step, ctx)
+                finally:
+                    # Observers may still fail the step, e.g. over its memory budget
+                    if started:
+                        self._step_finished(observers[:started], step, start)
+                status = step.status
+                if (
+                    status is not StatusEnum.COMPLETE
+                    and status is not StatusEnum.SKIPPED
+                ):
+                    self._set_status(StatusEnum.ERROR, step.error)
                     logging.exception(step.error)
                     return
+            except PipelineCancelledError as e:
+                step.cancelled(e)
+                self._set_status(StatusEnum.CANCELLED, e)
+                return
             except Exception as e:
                 step.errored(e)
-                self._error = e
-                self._status = StatusEnum.ERROR
+                self._set_status(StatusEnum.ERROR, e)
                 return
 
-        self._executed.set()
-        self._status = StatusEnum.COMPLETE
+        self._set_status(StatusEnum.COMPLETE, executed=True)
+
+    def _step_finished(
+        self, observers: list[NodeObserver], step: BaseStep, start: float
+    ):
+        duration = time.perf_counter() - start
+        error: Optional[Exception] = None
+        for observer in observers:
+            # Every observer is called, the first error fails the step
+            try:
+                observer.step_finished(self, step, duration)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def _set_status(
+        self,
+        status: StatusEnum,
+        error: Optional[BaseException] = None,
+        executed: bool = False,
+    ):
+        with self._state_lock:
+            if error is not None:
+                self._error = error
+            self._status = status
+            # Set last: threads waiting for the node must see its final status
+            if executed:
+                self._executed.set()
 
     def check_conditions(self) -> bool:
-        exec_conditions = [condition() for condition in self.conditions]
+        try:
+            exec_conditions = [condition() for condition in self.conditions]
+        except Exception as e:
+            # A condition that cannot be evaluated fails the node like a step
+            self._set_status(StatusEnum.ERROR, e)
+            return False
         is_conditions_ok = all(exec_conditions)
 
         if not is_conditions_ok:
-            self._status = StatusEnum.CONDITION_FAILED
-            self._error = ConditionError(
-                f"One or more condition are not met: {exec_conditions}"
+            self._set_status(
+                StatusEnum.CONDITION_FAILED,
+                ConditionError(f"One or more condition are not met: {exec_conditions}"),
             )
 
         return is_conditions_ok
 
+    def finish(self, status: StatusEnum, error: Optional[BaseException] = None):
+        # Applies the outcome of steps that were run outside of this node, e.g. by a
+        # remote worker
+        with self._state_lock:
+            self._error = error
+            self._status = status
+            if status & StatusEnum.OK:
+                self._executed.set()
+
+    def reset(self):
+        # Back to the state of a node that never ran, the steps included
+        with self._state_lock:
+            self._status = StatusEnum.UNKNOWN
+            self._error = None
+            self._executed.clear()
+            self.update_run_flag()
+        for step in self.steps:
+            step.unknown()
+            step.error = None
+
+    def skip(self):
+        for step in self.steps:
+            step.skipped()
+        self._set_status(StatusEnum.SKIPPED, executed=True)
+
     def add_steps(self, *steps: BaseStep) -> Self:
         self.steps.extend(steps)
         self.inputs.update(inp.as_pipevar() for step in steps for inp in step.inputs())
         self.outputs.update(
             inp.as_pipevar() for step in steps for inp in step.outputs()
         )
+        self.required_resources.update(
+            name for step in steps for name in step.required_resources()
+        )
         return self
 
+    # Only the links are recorded, the run flags are computed by build and before
+    # every run
     def add_child_nodes(self, *nodes: "ChildNode") -> Self:
         self.child_nodes.update(nodes)
-        for node in nodes:
-            node.update_run_flag()
         return self
 
     def add_parent_nodes(self, *nodes: "ParentNode") -> Self:
         self.parent_nodes.update(nodes)
-        self.update_run_flag()
         return self
 
     def __str__(self) -> str:
@@ -141,8 +334,19 @@ class PipeNode:
         return self._executed.is_set()
 
     def view(self, graph: graphviz.Digraph) -> graphviz.Digraph:
+        self.view_cluster(graph)
+        for p in self.parent_nodes:
+            self.view_edge(graph, p)
+        return graph
+
+    def view_cluster(self, graph: graphviz.Digraph) -> graphviz.Digraph:
         sg = graphviz.Digraph(f"cluster_{self._id}")
-        sg.attr(label=self.name, color="grey")
+        label = (
+            self.name
+            if self.resource_class == DEFAULT_RESOURCE_CLASS
+            else f"{self.name} [{self.resource_class}]"
+        )
+        sg.attr(label=label, color="grey")
 
         if self.steps:
             first_step = self.first_step
@@ -162,18 +366,51 @@ class PipeNode:
                 sg.edge(self.steps[prev_id].str_id, step.str_id)
 
         graph.subgraph(sg)
-        if self.parent_nodes:
-            for p in self.parent_nodes:
-                graph.edge(
-                    f"{p.last_step.str_id}",
-                    f"{self.first_step.str_id}",
-                    ltail=f"cluster_{p.id}",
-                    lhead=f"cluster_{self._id}",
-                )
+        return graph
+
+    def view_edge(
+        self, graph: graphviz.Digraph, parent_node: "ParentNode"
+    ) -> graphviz.Digraph:
+        graph.edge(
+            f"{parent_node.last_step.str_id}",
+            f"{self.first_step.str_id}",
+            ltail=f"cluster_{parent_node.id}",
+            lhead=f"cluster_{self._id}",
+        )
         return graph
 
     def __hash__(self) -> int:
-        return self.id
+        return self._id
+
+    def __getstate__(self) -> dict:
+        # Links to other nodes are restored by the pipeline owning the node
+        state = self.__dict__.copy()
+        for key in (
+            "parent_nodes",
+            "child_nodes",
+            "branch",
+            "all_parents_executed",
+            "_state_lock",
+        ):
+            del state[key]
+        # Observers and backends are bound to the pipeline run that set them
+        state["observers"] = []
+        state["backend"] = None
+        state["_executed"] = self.executed
+        return state
+
+    def __setstate__(self, state: dict):
+        executed = state.pop("_executed")
+        self.__dict__.update(state)
+        self._id = id(self)
+        self.parent_nodes = set()
+        self.child_nodes = set()
+        self.branch = set()
+        self._state_lock = threading.Lock()
+        self.update_run_flag()
+        self._executed = threading.Event()
+        if executed:
+            self._executed.set()
 
     # TODO refactor theses dunder methods and the corresponding ones in NodeComp
     # to avoid repetitions
@@ -229,12 +466,12 @@ class NodeComp:
             case PipeNode():
                 for step in self.nodes:
                     step.add_child_nodes(other)
-                    other.add_parent_nodes(*self.nodes)
+                other.add_parent_nodes(*self.nodes)
             case NodeComp():
                 for step in self.nodes:
                     step.add_child_nodes(*other.nodes)
-                    for node in other.nodes:
-                        node.add_parent_nodes(*self.nodes)
+                for node in other.nodes:
+                    node.add_parent_nodes(*self.nodes)
         return other
 
     def __or__(self, other: ConditionExpr | tuple[ConditionExpr, ...]):
@@ -265,12 +502,131 @@ class Pipeline:
         self.add_nodes(self.root_node, self.final_node)
 
         self.default_thread_count = 4
+        # Worker count of the dedicated pool of each resource class
+        self.resource_classes: dict[str, int] = {}
+        self.resources = ResourceRegistry()
 
         self.remaining_nodes = threading.Semaphore(len(self.nodes))
         self._running_nodes: int = 0
         self.runtime_error: Optional[BaseException] = None
+        self.fail_fast = False
+        self.cancel_token = CancelToken()
+        self._run_lock = threading.Lock()
+        # Set whenever the thread waiting in execute must check the run state again
+        self._wakeup = threading.Event()
+        self._node_deadlines: dict[PipeNode, float] = {}
+        self._futures: list[Future] = []
+        # Optional nodes dropped by the last run to meet its deadline
+        self.dropped_nodes: list[PipeNode] = []
+        self._deadline_at: Optional[float] = None
+        self._optional_tokens: dict[PipeNode, CancelToken] = {}
+        # Nodes whose conditions failed and the nodes skipped downstream of them
+        self._pruned_nodes: set[PipeNode] = set()
 
         self.parallel_nodes: dict[PipeNode, set[PipeNode]] = defaultdict(set)
+        self.io_validated = False
+        self._built = False
+        self.observers: list[NodeObserver] = []
+        self.backend: Optional[ExecutionBackend] = None
+        self.concurrency: Optional["AdaptiveConcurrency"] = None
+        # Consecutive ready children a worker runs itself before queueing them all
+        self.inline_limit = 64
+        # Subgraphs needed by each set of targets, cleared by build
+        self._target_plans: dict[frozenset[PipeVar], _TargetPlan] = {}
+        self._plan: Optional[_TargetPlan] = None
+        self._pending_parents: dict[PipeNode, int] = {}
+        self._node_callbacks: list[NodeCallback] = []
+        self._var_callbacks: dict[PipeVar, list[VarCallback]] = defaultdict(list)
+        # Set once the nodes of this pipeline were inlined in another pipeline
+        self.embedded = False
+        # Steps replaced by a copy of the results of an identical step by build
+        self.deduplicated_steps: list[DeduplicatedStep] = []
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for key in (
+            "remaining_nodes",
+            "_run_lock",
+            "_wakeup",
+            "_node_deadlines",
+            "_futures",
+            "_optional_tokens",
+            "_pruned_nodes",
+        ):
+            del state[key]
+        state["observers"] = []
+        state["backend"] = None
+        state["concurrency"] = None
+        # Pools hold live handles, they are added again to the loaded pipeline
+        state["resources"] = ResourceRegistry()
+        state["_target_plans"] = {}
+        state["_plan"] = None
+        state["_pending_parents"] = {}
+        state["_node_callbacks"] = []
+        state["_var_callbacks"] = defaultdict(list)
+
+        # Nodes are pickled without their links, which are stored as indices instead
+        nodes = list(self.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        try:
+            state["_topology"] = [
+                (
+                    [index[child_node] for child_node in node.child_nodes],
+                    [index[branch_node] for branch_node in node.branch],
+                )
+                for node in nodes
+            ]
+        except KeyError as e:
+            raise PipelineSerializationError(
+                f"{e.args[0]} is not registered in {self.name}, "
+                "the pipeline must be built before being pickled"
+            ) from e
+        state["nodes"] = nodes
+        # Only needed to validate the I/O, whose result is kept in io_validated, and
+        # quadratic in the number of nodes
+        del state["parallel_nodes"]
+        return state
+
+    def __setstate__(self, state: dict):
+        nodes: list[PipeNode] = state.pop("nodes")
+        topology: list[tuple[list[int], list[int]]] = state.pop("_topology")
+        self.__dict__.update(state)
+
+        for node, (child_ids, branch_ids) in zip(nodes, topology):
+            node.child_nodes.update(nodes[i] for i in child_ids)
+            node.branch.update(nodes[i] for i in branch_ids)
+            for i in child_ids:
+                nodes[i].parent_nodes.add(node)
+        for node in nodes:
+            node.update_run_flag()
+
+        self.nodes = set(nodes)
+        self.parallel_nodes = defaultdict(set)
+
+        self.remaining_nodes = threading.Semaphore(len(self.nodes))
+        self._run_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._node_deadlines = {}
+        self._futures = []
+        self._optional_tokens = {}
+        self._pruned_nodes = set()
+
+    def add_resource_class(self, name: str, max_workers: int) -> Self:
+        if name == DEFAULT_RESOURCE_CLASS:
+            raise ResourceClassError(
+                f"The resource class {name!r} is sized by the context thread_count"
+            )
+        if max_workers < 1:
+            raise ResourceClassError(
+                f"Resource class {name!r} needs at least one worker: {max_workers=}"
+            )
+        self.resource_classes[name] = max_workers
+        return self
+
+    @property
+    def built(self) -> bool:
+        # Also with check_io=False, unlike io_validated
+        return self._built
 
     def add_node(self, node: PipeNode):
         self.nodes.add(node)
@@ -327,6 +683,30 @@ class Pipeline:
         self.nodes.add(parent_node)
         return self
 
+    def add_edges(self, edges: Iterable[tuple[PipeNode, PipeNode]]) -> Self:
+        # Bulk wiring of (parent, child) pairs in a single pass
+        nodes = self.nodes
+        for parent_node, child_node in edges:
+            parent_node.child_nodes.add(child_node)
+            child_node.parent_nodes.add(parent_node)
+            nodes.add(parent_node)
+            nodes.add(child_node)
+        return self
+
+    def connect(
+        self, parent_nodes: Iterable[PipeNode], child_nodes: Iterable[PipeNode]
+    ) -> Self:
+        # Every parent node becomes a parent of every child node
+        parent_nodes = list(parent_nodes)
+        child_nodes = list(child_nodes)
+        for parent_node in parent_nodes:
+            parent_node.child_nodes.update(child_nodes)
+        for child_node in child_nodes:
+            child_node.parent_nodes.update(parent_nodes)
+        self.nodes.update(parent_nodes)
+        self.nodes.update(child_nodes)
+        return self
+
     def start_nodes(self, *nodes: PipeNode) -> Self:
         self.add_children_to(self.root_node, *nodes)
         return self
@@ -336,38 +716,580 @@ class Pipeline:
             if len(node.child_nodes) == 0:
                 self.add_child_to(node, self.final_node)
         self._compute_branches()
+        for node in self.nodes:
+            node.update_run_flag()
 
-    def execute(self, ctx: BasePipelineContext):
+    def on_node_complete(self, callback: NodeCallback) -> Self:
+        # Called from the worker thread with every node that ran, failed or was
+        # skipped, as soon as it is done
+        self._node_callbacks.append(callback)
+        return self
+
+    def on_var_set(self, var: PipeVar, callback: VarCallback) -> Self:
+        # Called with the var and its value once the node producing it completed
+        self._var_callbacks[var].append(callback)
+        return self
+
+    def stream(
+        self,
+        ctx: BasePipelineContext,
+        fail_fast: bool = False,
+        timeout: Optional[float] = None,
+        targets: Optional[Iterable[PipeVar]] = None,
+        deadline: Optional[float] = None,
+        tenant: Optional[str] = None,
+    ) -> Iterator[tuple[PipeNode, StatusEnum, dict[PipeVar, Any]]]:
+        # Runs execute in a background thread and yields the nodes as they are done
+        # with the values of their outputs. Leaving the loop early cancels the run.
+        events: queue.Queue[Optional[tuple]] = queue.Queue()
+        # Raised by execute before or after the run, e.g. for unknown targets
+        errors: list[BaseException] = []
+
+        def put_event(node: PipeNode):
+            events.put((node, node.status, _output_values(node)))
+
+        def run():
+            try:
+                self.execute(
+                    ctx, fail_fast, timeout, targets, deadline=deadline, tenant=tenant
+                )
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                events.put(None)
+
+        self._node_callbacks.append(put_event)
+        thread = threading.Thread(target=run, name=f"{self.name} stream", daemon=True)
+        thread.start()
+        try:
+            while (event := events.get()) is not None:
+                yield event
+            if errors:
+                raise errors[0]
+        finally:
+            if thread.is_alive():
+                self.cancel(PipelineCancelledError("The stream was closed early"))
+            thread.join()
+            self._node_callbacks.remove(put_event)
+
+    def _node_done(self, node: PipeNode):
+        callbacks = self._node_callbacks
+        var_callbacks = self._var_callbacks
+        if not callbacks and not var_callbacks:
+            return
+        # A failing callback is logged, it does not stop the run
+        for callback in callbacks:
+            try:
+                callback(node)
+            except Exception as e:
+                logging.exception(e)
+        if node.status is not StatusEnum.COMPLETE:
+            return
+        for var in node.outputs:
+            if var not in var_callbacks:
+                continue
+            try:
+                value = var.get()
+            except NoDefaultError:
+                continue
+            for var_callback in var_callbacks[var]:
+                try:
+                    var_callback(var, value)
+                except Exception as e:
+                    logging.exception(e)
+
+    def execute(
+        self,
+        ctx: BasePipelineContext,
+        fail_fast: bool = False,
+        timeout: Optional[float] = None,
+        targets: Optional[Iterable[PipeVar]] = None,
+        executors: Optional[dict[str, Executor]] = None,
+        deadline: Optional[float] = None,
+        tenant: Optional[str] = None,
+    ):
+        # Optional nodes that cannot finish within deadline seconds are dropped, see
+        # dropped_nodes. Unlike the timeout, missing the deadline does not fail the run.
+        # Executors given by the caller, e.g. a server, are shared between runs: they
+        # are neither created nor shut down here. Without executors, the nodes of the
+        # default resource class go to the global scheduler when one is set, queued
+        # for tenant, this pipeline by default, to share its workers fairly with the
+        # other runs.
+        self._check_not_embedded()
+        self.reset()
+        # With targets, only the nodes producing them and their ancestors run, the
+        # other nodes are skipped
+        self._plan = None if targets is None else self.target_plan(targets)
+        if self._plan is not None:
+            self._pending_parents = dict(self._plan.parent_counts)
+            for node in self.nodes - self._plan.nodes:
+                node.skip()
         self.remaining_nodes = threading.Semaphore(len(self.nodes))
         self.running_nodes = 0
+        self.runtime_error = None
+        self.fail_fast = fail_fast
+        self.cancel_token = CancelToken()
+        self._wakeup.clear()
+        self._node_deadlines.clear()
+        self._optional_tokens.clear()
+        self._pruned_nodes.clear()
+        self.dropped_nodes = []
+        start = time.monotonic()
+        run_deadline = None if timeout is None else start + timeout
+        self._deadline_at = None if deadline is None else start + deadline
         thread_count = ctx.thread_count or self.default_thread_count
-        with ThreadPoolExecutor(thread_count) as executor:
-            executor.submit(self._parse_run, ctx, self.root_node, executor)
-            while self._keep_running():
-                time.sleep(1)
+        if self.concurrency is not None:
+            thread_count = self.concurrency.max_workers
+        self.validate_resource_classes()
+        self.validate_resources()
+        scheduler = get_global_scheduler() if executors is None else None
+        if scheduler is not None:
+            thread_count = scheduler.max_workers
+        pools = {DEFAULT_RESOURCE_CLASS: thread_count, **self.resource_classes}
+        if executors is not None:
+            missing_pools = pools.keys() - executors.keys()
+            if missing_pools:
+                raise ResourceClassError(
+                    f"No executor was given for the resource classes {missing_pools}"
+                )
+        workers = sum(pools.values())
+        self._futures = []
+        for observer in self.observers:
+            observer.run_started(self, workers)
+        try:
+            with ExitStack() as stack:
+                run_executors = executors or {
+                    name: stack.enter_context(
+                        ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+                    )
+                    for name, max_workers in pools.items()
+                    if scheduler is None or name != DEFAULT_RESOURCE_CLASS
+                }
+                if scheduler is not None:
+                    run_executors[DEFAULT_RESOURCE_CLASS] = scheduler.executor(
+                        tenant or f"{self.name}:{id(self)}"
+                    )
+                self._submit(ctx, self.root_node, run_executors)
+                self._wait(run_deadline, timeout)
+
+                if self.cancel_token.cancelled:
+                    # Queued nodes are dropped, running ones are only waited for
+                    if executors is None:
+                        for executor in run_executors.values():
+                            executor.shutdown(wait=False, cancel_futures=True)
+                    else:
+                        for future in list(self._futures):
+                            future.cancel()
+                if executors is not None or scheduler is not None:
+                    self._wait_futures()
+                if self.runtime_error is not None:
+                    logging.exception(self.runtime_error)
+        finally:
+            if self.resources.close_after_run:
+                self.resources.close()
+            for observer in self.observers:
+                observer.run_finished(self, workers)
+
+    def _wait_futures(self):
+        # Nodes still running may submit children until they are done
+        while pending := [future for future in self._futures if not future.done()]:
+            wait(pending)
+
+    def _wait(self, deadline: Optional[float], timeout: Optional[float]):
+        optional_deadline = self._deadline_at
+        while True:
+            self._wakeup.clear()
+            if not self._keep_running():
+                return
 
-        if self.runtime_error is not None:
-            logging.exception(self.runtime_error)
+            with self._run_lock:
+                deadlines = list(self._node_deadlines.items())
+            next_deadline = min(
+                (node_deadline for _, node_deadline in deadlines), default=deadline
+            )
+            if deadline is not None and next_deadline is not None:
+                next_deadline = min(next_deadline, deadline)
+            if optional_deadline is not None:
+                next_deadline = (
+                    optional_deadline
+                    if next_deadline is None
+                    else min(next_deadline, optional_deadline)
+                )
+            self._wakeup.wait(
+                None
+                if next_deadline is None
+                else max(next_deadline - time.monotonic(), 0)
+            )
 
-    def _parse_run(
-        self, ctx: BasePipelineContext, node: PipeNode, executor: ThreadPoolExecutor
+            now = time.monotonic()
+            if optional_deadline is not None and now >= optional_deadline:
+                # The optional nodes queued from now on are dropped before they start
+                optional_deadline = None
+                with self._run_lock:
+                    tokens = list(self._optional_tokens.items())
+                for node, token in tokens:
+                    token.cancel(
+                        PipelineCancelledError(
+                            f"{node.name} was dropped at the deadline of {self.name}"
+                        )
+                    )
+            if deadline is not None and now >= deadline:
+                self._fail(
+                    PipelineTimeoutError(
+                        f"{self.name} did not complete within {timeout}s"
+                    ),
+                    cancel=True,
+                )
+            for node, node_deadline in deadlines:
+                if now >= node_deadline and not node.executed:
+                    self._fail(
+                        PipelineTimeoutError(
+                            f"{node.name} did not complete within {node.timeout}s"
+                        ),
+                        cancel=True,
+                    )
+
+    def cancel(self, reason: Optional[BaseException] = None):
+        # Cancels the current run from any thread
+        self._fail(reason or PipelineCancelledError(f"{self.name} was cancelled"), True)
+
+    def _fail(self, error: Optional[BaseException], cancel: bool = False):
+        with self._run_lock:
+            if self.runtime_error is None:
+                self.runtime_error = error
+        if cancel or self.fail_fast:
+            self.cancel_token.cancel(error)
+            with self._run_lock:
+                tokens = list(self._optional_tokens.values())
+            for token in tokens:
+                token.cancel(error)
+        self._wakeup.set()
+
+    def use_adaptive_concurrency(self, concurrency: "AdaptiveConcurrency") -> Self:
+        # The default pool is sized for max_workers, the limiter admits fewer nodes
+        if self.concurrency is not None:
+            self.observers.remove(self.concurrency)
+        self.concurrency = concurrency
+        self.observers.append(concurrency)
+        return self
+
+    def validate_resource_classes(self):
+        unknown_classes: dict[str, list[str]] = defaultdict(list)
+        for node in self.nodes:
+            if (
+                node.resource_class != DEFAULT_RESOURCE_CLASS
+                and node.resource_class not in self.resource_classes
+            ):
+                unknown_classes[node.resource_class].append(node.name)
+        if unknown_classes:
+            raise ResourceClassError(
+                "Some nodes use resource classes that were not added to the "
+                f"pipeline: {pprint.pformat(dict(unknown_classes))}"
+            )
+
+    def validate_resources(self):
+        unknown_resources: dict[str, list[str]] = defaultdict(list)
+        for node in self.nodes:
+            for name in node.required_resources:
+                if name not in self.resources:
+                    unknown_resources[name].append(node.name)
+        if unknown_resources:
+            raise ResourceError(
+                "Some nodes use resources that were not added to the pipeline: "
+                f"{pprint.pformat(dict(unknown_resources))}"
+            )
+
+    def _submit(
+        self,
+        ctx: BasePipelineContext,
+        node: PipeNode,
+        executors: dict[str, Executor],
     ):
-        if node.status is not StatusEnum.UNKNOWN:
+        if self.cancel_token.cancelled:
+            return
+        for observer in self.observers:
+            observer.node_queued(node)
+        try:
+            future = executors[node.resource_class].submit(
+                self._parse_run, ctx, node, executors
+            )
+        except RuntimeError:
+            self._dequeued(node)
+            # The executors are shut down when the run is cancelled
+            if not self.cancel_token.cancelled:
+                raise
             return
+        self._futures.append(future)
+        if self.observers:
+            future.add_done_callback(
+                lambda future: future.cancelled() and self._dequeued(node)
+            )
+
+    def _dequeued(self, node: PipeNode):
+        for observer in self.observers:
+            observer.node_dequeued(node)
+
+    def _parse_run(
+        self,
+        ctx: BasePipelineContext,
+        node: PipeNode,
+        executors: dict[str, Executor],
+    ):
+        self._dequeued(node)
+        # A ready child continues on this thread instead of a queue round trip.
+        # The loop does not grow the stack, the limit only hands long chains back
+        # to the queue from time to time.
+        next_node: Optional[PipeNode] = node
+        inlined = 0
+        try:
+            while next_node is not None:
+                next_node = self._run_node(
+                    ctx, next_node, executors, inline=inlined < self.inline_limit
+                )
+                inlined += 1
+        except Exception as e:
+            # The future would keep the error and the run would wait forever
+            self._fail(e, cancel=True)
 
-        if not bool(node.status & StatusEnum.OK):
-            node.run(ctx)
+    def _run_node(
+        self,
+        ctx: BasePipelineContext,
+        node: PipeNode,
+        executors: dict[str, Executor],
+        inline: bool,
+    ) -> Optional[PipeNode]:
+        if node.status is not StatusEnum.UNKNOWN or self.cancel_token.cancelled:
+            return None
+
+        node.observers = self.observers
+        node.backend = self.backend
+        limiter = (
+            self.concurrency if node.resource_class == DEFAULT_RESOURCE_CLASS else None
+        )
+        if limiter is not None and not limiter.acquire(self.cancel_token):
+            return None
+        try:
+            if self._must_drop(node):
+                node.skip()
+                self._dropped(node)
+            else:
+                self._run_ready(ctx, node)
+        finally:
+            if limiter is not None:
+                limiter.release()
+        if node.status & (StatusEnum.OK | StatusEnum.KO):
+            self._node_done(node)
+
+        if node.status & (StatusEnum.ERROR | StatusEnum.CANCELLED):
+            self._fail(node.error)
+            return None
 
         if not node.executed:
-            return
+            return None
+
+        if node is self.final_node:
+            self._wakeup.set()
 
         if bool(node.status & StatusEnum.OK):
             self.remaining_nodes.acquire(blocking=False)
 
-        elif node.status is StatusEnum.KO:
-            self.runtime_error = node.error
-            return
-        executor.map(self._parse_run, repeat(ctx), node.child_nodes, repeat(executor))
+        elif node.status is StatusEnum.CONDITION_FAILED:
+            self._prune(ctx, node, executors)
+            return None
+
+        ready_nodes = self._release_children(node)
+        if len(ready_nodes) > 1:
+            # Required children are queued first and preferred as the continuation
+            ready_nodes.sort(key=attrgetter("optional"))
+        continuation = None
+        if inline and not self.cancel_token.cancelled:
+            # Children of other resource classes must run on their own pool
+            continuation = next(
+                (
+                    child_node
+                    for child_node in ready_nodes
+                    if child_node.resource_class == node.resource_class
+                ),
+                None,
+            )
+        for child_node in ready_nodes:
+            if child_node is not continuation:
+                self._submit(ctx, child_node, executors)
+        return continuation
+
+    def _run_ready(self, ctx: BasePipelineContext, node: PipeNode):
+        token = self.cancel_token
+        if node.optional and self._deadline_at is not None:
+            # Its own token lets the deadline cancel the node alone
+            token = CancelToken()
+            with self._run_lock:
+                self._optional_tokens[node] = token
+            if self.cancel_token.cancelled:
+                token.cancel(self.cancel_token.reason)
+        node.cancel_token = token
+        handles: dict[str, Any] = {}
+        if node.required_resources:
+            # Waiting for a pool keeps the worker, like the concurrency limit
+            try:
+                handles = self.resources.acquire(node.required_resources, token)
+            except PipelineCancelledError:
+                self._forget_optional(node, token)
+                if token is not self.cancel_token and not self.cancel_token.cancelled:
+                    # The deadline passed while it waited for the pool
+                    node.skip()
+                    self._dropped(node)
+                return
+            except Exception as e:
+                self._forget_optional(node, token)
+                node.finish(StatusEnum.ERROR, e)
+                return
+            for step in node.steps:
+                step.resources.update(handles)
+        start = time.monotonic()
+        try:
+            if node.timeout is None:
+                node.run_ready(ctx)
+            else:
+                with self._run_lock:
+                    self._node_deadlines[node] = start + node.timeout
+                self._wakeup.set()
+                try:
+                    node.run_ready(ctx)
+                finally:
+                    with self._run_lock:
+                        self._node_deadlines.pop(node, None)
+        finally:
+            if handles:
+                for step in node.steps:
+                    step.resources.clear()
+                self.resources.release(handles)
+            self._forget_optional(node, token)
+
+        if node.status is StatusEnum.COMPLETE:
+            node.last_duration = time.monotonic() - start
+        elif (
+            token is not self.cancel_token
+            and node.status is StatusEnum.CANCELLED
+            and not self.cancel_token.cancelled
+        ):
+            node.finish(StatusEnum.SKIPPED)
+            self._dropped(node)
+
+    def _forget_optional(self, node: PipeNode, token: CancelToken):
+        if token is not self.cancel_token:
+            with self._run_lock:
+                self._optional_tokens.pop(node, None)
+
+    def _must_drop(self, node: PipeNode) -> bool:
+        # Optional nodes only start when they are expected to end before the deadline
+        if not node.optional or self._deadline_at is None:
+            return False
+        estimate = node.estimated_duration
+        if estimate is None:
+            estimate = node.last_duration or 0.0
+        return time.monotonic() + estimate > self._deadline_at
+
+    def _dropped(self, node: PipeNode):
+        # A dropped node counts as skipped, its children still run
+        with self._run_lock:
+            self.dropped_nodes.append(node)
+        logging.info(f"{node.name} was dropped to meet the deadline of {self.name}")
+
+    def _prune(
+        self,
+        ctx: BasePipelineContext,
+        node: PipeNode,
+        executors: dict[str, Executor],
+    ):
+        # Single pass over the downstream subgraph: each edge releases its child once.
+        # A child only runs when its last parent is released and at least one of its
+        # parents completed or was dropped, otherwise it is skipped and its own
+        # children released.
+        with self._run_lock:
+            self._pruned_nodes.add(node)
+        pruned_nodes = [node]
+        while pruned_nodes:
+            pruned_node = pruned_nodes.pop()
+            for child_node in self._release_children(pruned_node):
+                if child_node is self.final_node or self._has_live_parent(child_node):
+                    self._submit(ctx, child_node, executors)
+                else:
+                    # Marked before its children are released
+                    with self._run_lock:
+                        self._pruned_nodes.add(child_node)
+                    child_node.skip()
+                    self._node_done(child_node)
+                    pruned_nodes.append(child_node)
+
+    def _has_live_parent(self, node: PipeNode) -> bool:
+        # Dropped optional nodes are skipped like pruned ones but their children run.
+        # Called once every parent is done, whatever order they finished in.
+        plan = self._plan
+        with self._run_lock:
+            return any(
+                parent.status & StatusEnum.OK
+                and parent not in self._pruned_nodes
+                and (plan is None or parent in plan.nodes)
+                for parent in node.parent_nodes
+            )
+
+    def _release_children(self, node: PipeNode) -> list[PipeNode]:
+        plan = self._plan
+        if plan is None:
+            return [
+                child_node for child_node in node.child_nodes if child_node.release()
+            ]
+
+        ready_nodes = []
+        with self._run_lock:
+            for child_node in plan.children[node]:
+                self._pending_parents[child_node] -= 1
+                if not self._pending_parents[child_node]:
+                    ready_nodes.append(child_node)
+        return ready_nodes
+
+    def target_plan(self, targets: Iterable[PipeVar]) -> "_TargetPlan":
+        key = frozenset(
+            target.as_pipevar() if isinstance(target, (InVar, OutVar)) else target
+            for target in targets
+        )
+        plan = self._target_plans.get(key)
+        if plan is None:
+            plan = self._target_plans[key] = self._compute_target_plan(key)
+        return plan
+
+    def _compute_target_plan(self, targets: frozenset[PipeVar]) -> "_TargetPlan":
+        producers = {
+            var: [node for node in self.nodes if var in node.outputs] for var in targets
+        }
+        missing = [
+            var.get_name() or repr(var) for var, nodes in producers.items() if not nodes
+        ]
+        if missing:
+            raise TargetError(f"No node of {self.name} produces the targets {missing}")
+
+        required: set[PipeNode] = {self.final_node}
+        stack = [node for nodes in producers.values() for node in nodes]
+        while stack:
+            node = stack.pop()
+            if node in required:
+                continue
+            required.add(node)
+            stack.extend(node.parent_nodes)
+
+        # Required nodes without required children lead to the final node directly
+        children: dict[PipeNode, tuple[PipeNode, ...]] = {self.final_node: ()}
+        parent_counts: dict[PipeNode, int] = defaultdict(int)
+        for node in required - {self.final_node}:
+            node_children = tuple(
+                child_node
+                for child_node in node.child_nodes
+                if child_node in required and child_node is not self.final_node
+            ) or (self.final_node,)
+            children[node] = node_children
+            for child_node in node_children:
+                parent_counts[child_node] += 1
+        return _TargetPlan(frozenset(required), children, dict(parent_counts))
 
     def _keep_running(self):
         return not self.final_node.executed and self.runtime_error is None
@@ -376,28 +1298,408 @@ class Pipeline:
         self,
         *args: PipeNode | NodeComp,
         check_io: bool = True,
+        deduplicate: bool = False,
     ):
         # self.start_nodes(*start_nodes)
+        self._check_not_embedded()
+        self._target_plans.clear()
         self.register_nodes_from(self.root_node)
+        self._inline_sub_pipelines()
         self.terminate_pipeline()
+        if deduplicate:
+            # Only for pure functions, see deduplicate_steps
+            self.deduplicated_steps.extend(deduplicate_steps(self))
+        self._built = True
         if check_io:
             self.validate_io()
 
     def register_nodes_from(self, start_node: PipeNode):
         self._map_once(start_node, lambda pl, node: pl.nodes.add(node))
 
-    def _compute_branches(self):
-        def add_branch(_: Pipeline, node: PipeNode):
-            for parent in node.parent_nodes:
-                node.branch.add(parent)
-                node.branch.update(parent.branch)
-            if node in node.branch:
-                raise CycleError(
-                    "The following nodes are part of cycles which are "
-                    f"node allowed: {node.name}"
+    # Changes of a built pipeline that only update the branches of the descendants
+    # of the change and, when the I/O was validated, only check the pairs of nodes
+    # that become parallel. They must not run while the pipeline runs.
+
+    def insert_node(
+        self,
+        node: PipeNode,
+        parent_nodes: Iterable[PipeNode],
+        child_nodes: Iterable[PipeNode] = (),
+    ) -> Self:
+        parent_nodes = list(parent_nodes)
+        # A node without children leads to the final node, as with build
+        child_nodes = list(child_nodes) or [self.final_node]
+        self._check_mutable(*parent_nodes, *child_nodes)
+        if node in self.nodes:
+            raise GraphMutationError(f"{node.name} is already part of {self.name}")
+        if isinstance(node, SubPipelineNode):
+            raise GraphMutationError(
+                f"{node.name} must be inlined, build {self.name} again instead"
+            )
+        if not parent_nodes:
+            raise GraphMutationError(f"{node.name} needs a parent to be reachable")
+        if self.final_node in parent_nodes or self.root_node in child_nodes:
+            raise GraphMutationError(
+                f"{node.name} cannot come after the final node or before the root node"
+            )
+
+        branch = set(parent_nodes).union(*(parent.branch for parent in parent_nodes))
+        descendants = self._descendants(child_nodes)
+        if not branch.isdisjoint(descendants):
+            raise CycleError(
+                f"Inserting {node.name} would create a cycle through "
+                f"{', '.join(sorted(n.name for n in branch & descendants))}"
+            )
+        if self.io_validated:
+            self._check_parallel_io(
+                (node, other)
+                for other in self.nodes
+                if other not in branch and other not in descendants
+            )
+        self._check_deduplicated(node, descendants)
+
+        node.add_parent_nodes(*parent_nodes)
+        node.add_child_nodes(*child_nodes)
+        for parent_node in parent_nodes:
+            parent_node.add_child_nodes(node)
+        for child_node in child_nodes:
+            child_node.add_parent_nodes(node)
+            child_node.update_run_flag()
+        node.branch = branch
+        branch = branch | {node}
+        for descendant in descendants:
+            descendant.branch |= branch
+        node.update_run_flag()
+        self.nodes.add(node)
+        self._target_plans.clear()
+        return self
+
+    def insert_edge(self, parent_node: PipeNode, child_node: PipeNode) -> Self:
+        # The nodes only get ordered: no nodes become parallel
+        self._check_mutable(parent_node, child_node)
+        if parent_node is self.final_node or child_node is self.root_node:
+            raise GraphMutationError(
+                "No edge can leave the final node or lead to the root node"
+            )
+        if child_node is parent_node or child_node in parent_node.branch:
+            raise CycleError(
+                f"An edge from {parent_node.name} to {child_node.name} would create "
+                "a cycle"
+            )
+        parent_node.add_child_nodes(child_node)
+        child_node.add_parent_nodes(parent_node)
+        child_node.update_run_flag()
+        branch = parent_node.branch | {parent_node}
+        for descendant in self._descendants([child_node]):
+            descendant.branch |= branch
+        self._target_plans.clear()
+        return self
+
+    def remove_edge(self, parent_node: PipeNode, child_node: PipeNode) -> Self:
+        self._check_mutable(parent_node, child_node)
+        if child_node not in parent_node.child_nodes:
+            raise GraphMutationError(
+                f"There is no edge from {parent_node.name} to {child_node.name}"
+            )
+        if len(child_node.parent_nodes) == 1:
+            raise GraphMutationError(f"{child_node.name} would not be reachable")
+        if child_node is self.final_node and len(parent_node.child_nodes) == 1:
+            raise GraphMutationError(
+                f"{parent_node.name} has no other child, it must lead to the final node"
+            )
+
+        def unlink():
+            parent_node.child_nodes.discard(child_node)
+            child_node.parent_nodes.discard(parent_node)
+            child_node.update_run_flag()
+
+        def link():
+            parent_node.add_child_nodes(child_node)
+            child_node.add_parent_nodes(parent_node)
+            child_node.update_run_flag()
+
+        unlink()
+        self._rebranch([child_node], undo=link)
+        return self
+
+    def remove_node(self, node: PipeNode) -> Self:
+        self._check_mutable(node)
+        if node is self.root_node or node is self.final_node:
+            raise GraphMutationError(f"{node.name} cannot be removed")
+        parent_nodes = set(node.parent_nodes)
+        child_nodes = set(node.child_nodes)
+        # Parents left without children lead to the final node, as with build
+        leaves = [
+            parent_node
+            for parent_node in parent_nodes
+            if parent_node.child_nodes == {node}
+        ]
+        orphans = [
+            child_node.name
+            for child_node in child_nodes
+            if len(child_node.parent_nodes) == 1
+            and not (child_node is self.final_node and leaves)
+        ]
+        if orphans:
+            raise GraphMutationError(
+                f"Removing {node.name} would make {orphans} unreachable"
+            )
+
+        def unlink():
+            for parent_node in parent_nodes:
+                parent_node.child_nodes.discard(node)
+            for child_node in child_nodes:
+                child_node.parent_nodes.discard(node)
+            for leaf in leaves:
+                leaf.add_child_nodes(self.final_node)
+                self.final_node.add_parent_nodes(leaf)
+            self.nodes.discard(node)
+            for child_node in child_nodes | {self.final_node}:
+                child_node.update_run_flag()
+
+        def link():
+            for leaf in leaves:
+                leaf.child_nodes.discard(self.final_node)
+                self.final_node.parent_nodes.discard(leaf)
+            for parent_node in parent_nodes:
+                parent_node.add_child_nodes(node)
+            for child_node in child_nodes:
+                child_node.add_parent_nodes(node)
+            self.nodes.add(node)
+            for child_node in child_nodes | {self.final_node}:
+                child_node.update_run_flag()
+
+        unlink()
+        self._rebranch(child_nodes | {self.final_node}, undo=link)
+        return self
+
+    def _check_mutable(self, *nodes: PipeNode):
+        if not self._built:
+            raise GraphMutationError(f"{self.name} must be built before it is changed")
+        unknown_nodes = [node.name for node in nodes if node not in self.nodes]
+        if unknown_nodes:
+            raise GraphMutationError(
+                f"The nodes {unknown_nodes} are not part of {self.name}"
+            )
+
+    def _descendants(self, nodes: Iterable[PipeNode]) -> set[PipeNode]:
+        descendants: set[PipeNode] = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node not in descendants:
+                descendants.add(node)
+                stack.extend(node.child_nodes)
+        return descendants
+
+    def _rebranch(self, nodes: Iterable[PipeNode], undo: Callable[[], None]):
+        # After removing links: recomputes the branches of the descendants of nodes in
+        # topological order and checks the nodes that are no longer their ancestors.
+        # On a conflict, undo restores the links and the branches are restored.
+        region = self._descendants(nodes)
+        pending_parents = {
+            node: sum(parent in region for parent in node.parent_nodes)
+            for node in region
+        }
+        ready = deque(node for node, count in pending_parents.items() if not count)
+        previous_branches: dict[PipeNode, set[PipeNode]] = {}
+        while ready:
+            node = ready.popleft()
+            previous_branches[node] = node.branch
+            node.branch = set(node.parent_nodes).union(
+                *(parent.branch for parent in node.parent_nodes)
+            )
+            for child_node in node.child_nodes:
+                pending_parents[child_node] -= 1
+                if not pending_parents[child_node]:
+                    ready.append(child_node)
+
+        try:
+            if self.io_validated:
+                self._check_parallel_io(
+                    (node, other)
+                    for node, branch in previous_branches.items()
+                    for other in branch - node.branch
+                    if other in self.nodes
+                )
+            self._check_deduplicated()
+        except (InputOutputConflictError, GraphMutationError):
+            undo()
+            for node, branch in previous_branches.items():
+                node.branch = branch
+            raise
+        self._target_plans.clear()
+
+    def _check_deduplicated(
+        self,
+        inserted_node: Optional[PipeNode] = None,
+        descendants: frozenset[PipeNode] | set[PipeNode] = frozenset(),
+    ):
+        # A copy made by deduplicate_steps stays right while its canonical step runs
+        # before it and no node after the canonical step writes the variables of
+        # that step. descendants are those of the children of inserted_node.
+        if not self.deduplicated_steps:
+            return
+        nodes_by_name = {node.name: node for node in self.nodes}
+        broken: list[str] = []
+        for deduplicated in self.deduplicated_steps:
+            node = nodes_by_name.get(deduplicated.node)
+            if node is None:
+                # Removed along with its copy
+                continue
+            canonical_node = nodes_by_name.get(deduplicated.canonical_node)
+            if canonical_node is None or (
+                canonical_node is not node and canonical_node not in node.branch
+            ):
+                broken.append(f"{deduplicated.node}: {deduplicated.step}")
+                continue
+            if inserted_node is None or canonical_node in descendants:
+                continue
+            # Steps of a node may share a name, all of them are considered
+            variables = set().union(
+                *(
+                    step_variables(step)
+                    for step in canonical_node.steps
+                    if step.name == deduplicated.canonical_step
+                )
+            )
+            if inserted_node.outputs & variables:
+                broken.append(f"{deduplicated.node}: {deduplicated.step}")
+        if broken:
+            raise GraphMutationError(
+                f"The change would invalidate the copies of the deduplicated steps "
+                f"{sorted(broken)}, build {self.name} again instead"
+            )
+
+    def _check_parallel_io(self, pairs: Iterable[tuple[PipeNode, PipeNode]]):
+        # Same rule as validate_io, for the given pairs of parallel nodes only
+        conflicts: dict[PipeVar, set[PipeNode]] = defaultdict(set)
+        for node, other in pairs:
+            for var in node.inputs & other.outputs | other.inputs & node.outputs:
+                conflicts[var].update((node, other))
+        if conflicts:
+            raise InputOutputConflictError(
+                "Some inputs would be used in a node while also used as outputs in "
+                "parallel nodes:\n"
+                + pprint.pformat(
+                    {
+                        var.get_name(): tuple(sorted(node.name for node in nodes))
+                        for var, nodes in conflicts.items()
+                    }
                 )
+            )
 
-        self.map_pipeline(add_branch)
+    def as_node(
+        self,
+        name: Optional[str] = None,
+        inputs: Optional[dict[PipeVar, PipeVar]] = None,
+        outputs: Optional[dict[PipeVar, PipeVar]] = None,
+    ) -> "SubPipelineNode":
+        return SubPipelineNode(self, name, inputs, outputs)
+
+    def _inline_sub_pipelines(self):
+        # Sub-pipelines may contain sub-pipelines themselves
+        while sub_nodes := [
+            node
+            for node in self.nodes
+            if isinstance(node, SubPipelineNode) and not node.pipeline.embedded
+        ]:
+            for sub_node in sub_nodes:
+                self._inline(sub_node)
+            self.register_nodes_from(self.root_node)
+
+    def _inline(self, sub_node: "SubPipelineNode"):
+        inner = sub_node.pipeline
+        exit_node = sub_node.exit_node
+
+        # The exit node takes the place of the sub-pipeline node for its children
+        for child_node in sub_node.child_nodes:
+            child_node.parent_nodes.discard(sub_node)
+            exit_node >> child_node
+        sub_node.child_nodes.clear()
+
+        start_nodes = set(inner.root_node.child_nodes)
+        inner.root_node.child_nodes.clear()
+        for start_node in start_nodes:
+            start_node.parent_nodes.discard(inner.root_node)
+            sub_node >> start_node
+        if not start_nodes:
+            sub_node >> exit_node
+
+        inner_nodes: list[PipeNode] = []
+        visited: set[PipeNode] = {inner.final_node}
+        queue = deque(start_nodes)
+        while queue:
+            node = queue.popleft()
+            if node in visited:
+                continue
+            visited.add(node)
+            inner_nodes.append(node)
+            queue.extend(node.child_nodes)
+
+        for node in inner_nodes:
+            # Branches computed by a build of the inner pipeline are outdated
+            node.branch.clear()
+            node.child_nodes.discard(inner.final_node)
+            if not node.child_nodes:
+                node >> exit_node
+        inner.final_node.parent_nodes.clear()
+        inner.final_node.update_run_flag()
+
+        for resource_class, max_workers in inner.resource_classes.items():
+            self.resource_classes.setdefault(resource_class, max_workers)
+        for name, pool in inner.resources.pools.items():
+            self.resources.pools.setdefault(name, pool)
+        # The inner nodes now belong to this pipeline, only the unlinked root and
+        # final nodes are left to the inner one
+        inner.nodes = {inner.root_node, inner.final_node}
+        inner.final_node.branch.clear()
+        inner.embedded = True
+
+    def _check_not_embedded(self):
+        if self.embedded:
+            raise SubPipelineError(
+                f"{self.name} is inlined in another pipeline, it can no longer be "
+                "built or run on its own"
+            )
+
+    def _compute_branches(self):
+        # Single pass in topological order. A node and its ancestors are first
+        # gathered as the bits of an int: merging those of every parent is then one
+        # OR instead of a set union.
+        nodes = self.nodes
+        pending_parents: dict[PipeNode, int] = defaultdict(int)
+        for node in nodes:
+            for child_node in node.child_nodes:
+                pending_parents[child_node] += 1
+
+        order: list[PipeNode] = []
+        masks: dict[PipeNode, int] = {}
+        ready = deque(node for node in nodes if not pending_parents[node])
+        while ready:
+            node = ready.popleft()
+            mask = 1 << len(order)
+            for parent in node.parent_nodes:
+                # Parents that were not registered are not part of the branch
+                mask |= masks.get(parent, 0)
+            masks[node] = mask
+            order.append(node)
+            for child_node in node.child_nodes:
+                pending_parents[child_node] -= 1
+                if not pending_parents[child_node]:
+                    ready.append(child_node)
+
+        if len(order) < len(nodes):
+            # Nodes of a cycle, or downstream of one, never get all their parents
+            raise CycleError(
+                "The following nodes are part of cycles which are node allowed, or "
+                "downstream of one: "
+                f"{', '.join(sorted(node.name for node in nodes - masks.keys()))}"
+            )
+        for i, node in enumerate(order):
+            # Bit i is the node itself
+            bits = bin(masks[node])[:1:-1].encode()[:i].translate(_BIT_VALUES)
+            node.branch = set(compress(order, bits))
 
     # TODO maybe add map method to the PipeNode class directly
     def map_pipeline_once(self, func: Callable[[Self, PipeNode], None]):
@@ -432,18 +1734,13 @@ class Pipeline:
         self,
     ):
         parallel_nodes = self.parallel_nodes
+        # Computed again from scratch, the graph may have changed since
+        parallel_nodes.clear()
         i = 0
         graph = self.nodes
         remaning_nodes_to_visit = self.nodes.copy()
         for node_i in graph:
             remaning_nodes_to_visit.remove(node_i)
-            if (
-                len(node_i.parent_nodes) == 1
-                and len((parent := next(iter(node_i.parent_nodes))).child_nodes) == 1
-            ):
-                parallel_nodes[node_i].add(parent)
-                continue
-
             for node_j in remaning_nodes_to_visit:
                 if node_i in node_j.branch or node_j in node_i.branch:
                     continue
@@ -499,6 +1796,7 @@ class Pipeline:
             )
         if message_lines:
             raise InputOutputConflictError("\n".join(message_lines))
+        self.io_validated = True
 
     # def validate_cycles(self):
     #     cycles: set[PipeNode] = set()
@@ -512,16 +1810,179 @@ class Pipeline:
     #         )
 
     def reset(self):
-        raise NotImplementedError("The nodes must be reset (i.e. their locks)")
+        for node in self.nodes:
+            node.reset()
+        self.runtime_error = None
 
-    def graph(self, preview=True) -> graphviz.Digraph:
+    def status_snapshot(self) -> dict[PipeNode, StatusEnum]:
+        # Cheap enough to be polled while the pipeline is running
+        return {node: node.status for node in self.nodes}
+
+    def graph(
+        self,
+        preview=True,
+        collapse_chains: bool = False,
+        collapse: Iterable[Iterable[PipeNode]] = (),
+    ) -> graphviz.Digraph:
         pipeline_name = f"{self.name}_preview" if preview else self.name
-        graph = graphviz.Digraph(pipeline_name, strict=True)
+        graph = graphviz.Digraph(pipeline_name)
         graph.attr(compound="true", splines="curved")
-        self._graph(self.root_node, graph)
+
+        groups: dict[PipeNode, tuple[PipeNode, ...]] = {}
+        if collapse_chains:
+            for chain in self._chains():
+                groups.update((node, chain) for node in chain)
+        for nodes in collapse:
+            group = tuple(nodes)
+            groups.update((node, group) for node in group)
+
+        self._graph(graph, groups)
         return graph
 
-    def _graph(self, node: PipeNode, graph: graphviz.Digraph):
-        node.view(graph)
-        for child_node in node.child_nodes:
-            self._graph(child_node, graph)
+    def _graph(
+        self, graph: graphviz.Digraph, groups: dict[PipeNode, tuple[PipeNode, ...]]
+    ):
+        # Every node and edge is emitted once, collapsed groups are drawn as a single
+        # graphviz node by their first node
+        group_edges: set[tuple[str, str]] = set()
+
+        def view(_: Pipeline, node: PipeNode):
+            group = groups.get(node)
+            if group is None:
+                node.view_cluster(graph)
+            elif node is group[0]:
+                self._view_group(graph, group)
+
+            for parent_node in node.parent_nodes:
+                parent_group = groups.get(parent_node)
+                if group is None and parent_group is None:
+                    node.view_edge(graph, parent_node)
+                elif group is None or parent_group is not group:
+                    tail, ltail = (
+                        (parent_node.last_step.str_id, f"cluster_{parent_node.id}")
+                        if parent_group is None
+                        else (f"group_{parent_group[0].id}", None)
+                    )
+                    head, lhead = (
+                        (node.first_step.str_id, f"cluster_{node.id}")
+                        if group is None
+                        else (f"group_{group[0].id}", None)
+                    )
+                    # Edges between the nodes of two groups are drawn once
+                    if (tail, head) in group_edges:
+                        continue
+                    group_edges.add((tail, head))
+                    graph.edge(tail, head, ltail=ltail, lhead=lhead)
+
+        self._map_once(self.root_node, view)
+
+    def _view_group(self, graph: graphviz.Digraph, group: tuple[PipeNode, ...]):
+        statuses = {node.status for node in group}
+        status = next(
+            (status for status in GROUP_STATUS_PRIORITY if status in statuses),
+            StatusEnum.UNKNOWN,
+        )
+        step_count = sum(len(node.steps) for node in group)
+        graph.node(
+            f"group_{group[0].id}",
+            **{**BaseStep.STYLES.get(status, {}), "shape": "box3d"},
+            label=(
+                f"{group[0].name} ... {group[-1].name}\n"
+                f"{len(group)} nodes, {step_count} steps"
+            ),
+        )
+
+    def _chains(self) -> list[tuple[PipeNode, ...]]:
+        # Maximal sequences of nodes where each node is the only child of the previous
+        # one and the previous one is its only parent
+        def is_fused(parent_node: PipeNode, child_node: PipeNode) -> bool:
+            return (
+                len(parent_node.child_nodes) == 1
+                and len(child_node.parent_nodes) == 1
+                and parent_node is not self.root_node
+                and child_node is not self.final_node
+            )
+
+        chains: list[tuple[PipeNode, ...]] = []
+
+        def add_chain(_: Pipeline, node: PipeNode):
+            if len(node.parent_nodes) == 1 and is_fused(
+                next(iter(node.parent_nodes)), node
+            ):
+                return
+            chain = [node]
+            while len(chain[-1].child_nodes) == 1 and is_fused(
+                chain[-1], child_node := next(iter(chain[-1].child_nodes))
+            ):
+                chain.append(child_node)
+            if len(chain) > 1:
+                chains.append(tuple(chain))
+
+        self._map_once(self.root_node, add_chain)
+        return chains
+
+
+class _TargetPlan:
+    def __init__(
+        self,
+        nodes: frozenset[PipeNode],
+        children: dict[PipeNode, tuple[PipeNode, ...]],
+        parent_counts: dict[PipeNode, int],
+    ) -> None:
+        self.nodes = nodes
+        self.children = children
+        # Number of required parents each required node waits for
+        self.parent_counts = parent_counts
+
+
+def _output_values(node: PipeNode) -> dict[PipeVar, Any]:
+    values: dict[PipeVar, Any] = {}
+    for var in node.outputs:
+        try:
+            values[var] = var.get()
+        except NoDefaultError:
+            pass
+    return values
+
+
+class SubPipelineNode(PipeNode):
+    # Placeholder of a pipeline used as a node of another pipeline. At build, the
+    # nodes of the sub-pipeline are inlined between this node, which copies the
+    # outer inputs to the inner variables, and exit_node, which copies the inner
+    # outputs back. Both maps are keyed by the inner variables. The inner steps get
+    # the outer context when they run.
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        name: Optional[str] = None,
+        inputs: Optional[dict[PipeVar, PipeVar]] = None,
+        outputs: Optional[dict[PipeVar, PipeVar]] = None,
+    ) -> None:
+        if pipeline.embedded:
+            raise SubPipelineError(
+                f"{pipeline.name} is already inlined in another pipeline, "
+                "a new instance must be created for every use"
+            )
+        super().__init__(name or pipeline.name)
+        self.pipeline = pipeline
+        self.input_map = inputs or {}
+        self.output_map = outputs or {}
+        self.add_steps(
+            CopyStep(
+                (
+                    (outer_var.as_input(), inner_var.as_output())
+                    for inner_var, outer_var in self.input_map.items()
+                ),
+                name="Inputs",
+            )
+        )
+        self.exit_node = PipeNode(f"{self.name} outputs").add_steps(
+            CopyStep(
+                (
+                    (inner_var.as_input(), outer_var.as_output())
+                    for inner_var, outer_var in self.output_map.items()
+                ),
+                name="Outputs",
+            )
+        )
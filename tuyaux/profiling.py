@@ -0,0 +1,154 @@
+import logging
+import threading
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+from tuyaux.exceptions import MemoryBudgetError
+from tuyaux.observers import NodeObserver
+from tuyaux.steps import BaseStep, StatusEnum
+
+if TYPE_CHECKING:
+    from tuyaux.pipeline import PipeNode, Pipeline
+
+# The snapshots taken by the profiler allocate memory themselves
+_IGNORED_SITES = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+@dataclass
+class StepMemory:
+    node: str
+    step: str
+    # Bytes allocated above the memory in use when the step started
+    peak: int
+    # Bytes still allocated when the step finished, negative when it freed memory
+    net: int
+    top_sites: list[str] = field(default_factory=list)
+
+
+class MemoryProfiler(NodeObserver):
+    # Opt-in tracemalloc profiling of every step run by a pipeline:
+    #   pipeline.observers.append(MemoryProfiler(budget=512 * 2**20))
+    # tracemalloc counts the allocations of every thread, so steps run one at a
+    # time while the profiler is exclusive. Otherwise the figures of concurrent
+    # steps include each other's allocations. Collecting the top allocation sites
+    # takes two snapshots per step and is much slower.
+
+    def __init__(
+        self,
+        budget: Optional[int] = None,
+        fail_over_budget: bool = False,
+        top_sites: int = 0,
+        frames: int = 1,
+        exclusive: bool = True,
+    ) -> None:
+        self.budget = budget
+        self.fail_over_budget = fail_over_budget
+        self.top_sites = top_sites
+        self.frames = frames
+        self.exclusive = exclusive
+        self.records: list[StepMemory] = []
+        self._lock = threading.Lock()
+        self._step_lock = threading.Lock()
+        self._started: dict[int, tuple[int, Optional[tracemalloc.Snapshot]]] = {}
+        self._owns_tracing = False
+
+    def run_started(self, pipeline: "Pipeline", workers: int):
+        with self._lock:
+            self.records = []
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._owns_tracing = True
+
+    def run_finished(self, pipeline: "Pipeline", workers: int):
+        logging.info(f"Memory profile of {pipeline.name}:\n{self.report()}")
+        with self._lock:
+            if self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+    def step_started(self, node: "PipeNode", step: BaseStep):
+        if self.exclusive:
+            # Released by step_finished, which is always called
+            self._step_lock.acquire()
+        snapshot = tracemalloc.take_snapshot() if self.top_sites else None
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        with self._lock:
+            self._started[step.id] = (current, snapshot)
+
+    def step_finished(self, node: "PipeNode", step: BaseStep, duration: float):
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                start, start_snapshot = self._started.pop(step.id)
+            top_sites: list[str] = []
+            if start_snapshot is not None:
+                end_snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_SITES)
+                top_sites = [
+                    str(stat)
+                    for stat in end_snapshot.compare_to(
+                        start_snapshot.filter_traces(_IGNORED_SITES), "lineno"
+                    )[: self.top_sites]
+                ]
+        finally:
+            if self.exclusive:
+                self._step_lock.release()
+
+        record = StepMemory(
+            node.name, step.name, peak - start, current - start, top_sites
+        )
+        with self._lock:
+            self.records.append(record)
+
+        if self.budget is None or record.peak <= self.budget:
+            return
+        message = (
+            f"{step.name} of {node.name} allocated {_format_size(record.peak)}, over "
+            f"its budget of {_format_size(self.budget)}"
+        )
+        # Steps that already failed keep their own error
+        if self.fail_over_budget and step.status is StatusEnum.COMPLETE:
+            raise MemoryBudgetError(message)
+        logging.warning(message)
+
+    def node_report(self, node_name: str) -> list[StepMemory]:
+        with self._lock:
+            return [record for record in self.records if record.node == node_name]
+
+    def report(self) -> str:
+        with self._lock:
+            records = list(self.records)
+        nodes: dict[str, list[StepMemory]] = {}
+        for record in records:
+            nodes.setdefault(record.node, []).append(record)
+
+        lines = []
+        for node_name, node_records in nodes.items():
+            lines.append(
+                f"{node_name}: peak {_format_size(max(r.peak for r in node_records))}"
+                f", net {_format_size(sum(r.net for r in node_records))}"
+            )
+            for record in node_records:
+                lines.append(
+                    f"  {record.step}: peak {_format_size(record.peak)}"
+                    f", net {_format_size(record.net)}"
+                )
+                lines.extend(f"    {site}" for site in record.top_sites)
+        if records:
+            lines.append(
+                f"Run: peak {_format_size(max(r.peak for r in records))}"
+                f", net {_format_size(sum(r.net for r in records))}"
+            )
+        return "\n".join(lines)
+
+
+def _format_size(size: int) -> str:
+    value = float(abs(size))
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            break
+        value /= 1024
+    else:
+        unit = "GiB"
+    return f"{'-' if size < 0 else ''}{value:.1f} {unit}"
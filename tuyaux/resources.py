@@ -0,0 +1,138 @@
+import logging
+import threading
+from typing import Any, Callable, Generic, Iterable, Optional, TypeVar
+
+from tuyaux.cancellation import CancelToken
+from tuyaux.exceptions import ResourceError
+
+T = TypeVar("T")
+
+
+class Resource:
+    # FuncStep argument replaced by a handle of the named pool when the step runs:
+    #   QueryStep(ctx.rows.as_output(), None, "", Resource("db"), ctx.query)
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r})"
+
+
+class ResourcePool(Generic[T]):
+    # Up to max_size handles created on demand by factory and reused by the steps.
+    # A handle is used by one step at a time but not always from the same thread,
+    # e.g. SQLite connections must be opened with check_same_thread=False.
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        max_size: int = 1,
+        close: Optional[Callable[[T], None]] = None,
+    ) -> None:
+        if max_size < 1:
+            raise ResourceError(f"A pool holds at least one resource, got {max_size}")
+        self.factory = factory
+        self.max_size = max_size
+        # Calls the close method of the handles by default
+        self.close_resource = close
+        self._condition = threading.Condition()
+        self._idle: list[T] = []
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def acquire(self, cancel_token: CancelToken) -> T:
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                cancel_token.raise_if_cancelled()
+                # Woken up by releases, cancellation is only polled
+                self._condition.wait(0.1)
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+        # Created outside of the lock, other handles stay available meanwhile
+        try:
+            return self.factory()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, resource: T):
+        with self._condition:
+            self._idle.append(resource)
+            self._condition.notify()
+
+    def close(self):
+        # Closes the idle handles, the pool creates new ones when used again
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for resource in idle:
+            try:
+                if self.close_resource is not None:
+                    self.close_resource(resource)
+                elif callable(close := getattr(resource, "close", None)):
+                    close()
+            except Exception:
+                logging.exception(f"Could not close {resource!r}")
+
+
+class ResourceRegistry:
+    # Named pools shared by the steps of a pipeline:
+    #   pipeline.resources.add("db", lambda: sqlite3.connect(path), max_size=4)
+    # Nodes hold the handles needed by their steps while they run. The pools are
+    # closed at the end of every run unless close_after_run is False, e.g. when a
+    # server keeps the pipeline, which then closes them itself.
+
+    def __init__(self) -> None:
+        self.pools: dict[str, ResourcePool] = {}
+        self.close_after_run = True
+
+    def add(
+        self,
+        name: str,
+        factory: Callable[[], T],
+        max_size: int = 1,
+        close: Optional[Callable[[T], None]] = None,
+    ) -> ResourcePool[T]:
+        if name in self.pools:
+            raise ResourceError(f"A resource pool is already named {name!r}")
+        pool = self.pools[name] = ResourcePool(factory, max_size, close)
+        return pool
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.pools
+
+    def __getitem__(self, name: str) -> ResourcePool:
+        return self.pools[name]
+
+    def acquire(
+        self, names: Iterable[str], cancel_token: CancelToken
+    ) -> dict[str, Any]:
+        # Always in the order of the names, nodes cannot wait for each other's pools
+        handles: dict[str, Any] = {}
+        try:
+            for name in sorted(names):
+                handles[name] = self.pools[name].acquire(cancel_token)
+        except BaseException:
+            self.release(handles)
+            raise
+        return handles
+
+    def release(self, handles: dict[str, Any]):
+        for name, resource in handles.items():
+            self.pools[name].release(resource)
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+    def __enter__(self) -> "ResourceRegistry":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Optional
+
+# Charged to a tenant for its first task, before any duration was measured
+_INITIAL_COST = 0.001
+
+
+class _Task:
+    def __init__(self, future: Future, fn: Callable, args: tuple, kwargs: dict):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+class _Tenant:
+    def __init__(self, virtual_time: float) -> None:
+        self.queue: deque[_Task] = deque()
+        self.virtual_time = virtual_time
+        self.running = 0
+        # Moving average of the duration of its tasks
+        self.cost = _INITIAL_COST
+
+
+class FairScheduler:
+    # One bounded pool of workers shared by the runs of every pipeline of the
+    # process, installed with set_global_scheduler. Ready nodes are queued per
+    # tenant, the run itself unless execute is given a tenant, and the workers
+    # serve the tenants by weighted fair queuing: the next node is taken from the
+    # tenant that used the least worker time divided by its weight. A tenant
+    # that was idle starts again from the current virtual time and does not get
+    # the credit of its idle time.
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        weights: Optional[dict[str, float]] = None,
+        thread_name_prefix: str = "tuyaux",
+    ) -> None:
+        self.max_workers = max_workers
+        self.weights: dict[str, float] = dict(weights or {})
+        self.thread_name_prefix = thread_name_prefix
+        self._condition = threading.Condition()
+        self._tenants: dict[str, _Tenant] = {}
+        self._virtual_time = 0.0
+        self._threads: list[threading.Thread] = []
+        self._idle_workers = 0
+        self._shutdown = False
+
+    def set_weight(self, tenant: str, weight: float):
+        with self._condition:
+            self.weights[tenant] = weight
+
+    def executor(self, tenant: str) -> "TenantExecutor":
+        return TenantExecutor(self, tenant)
+
+    def queued(self) -> dict[str, int]:
+        with self._condition:
+            return {name: len(tenant.queue) for name, tenant in self._tenants.items()}
+
+    def _submit(self, tenant_name: str, task: _Task):
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            tenant = self._tenants.get(tenant_name)
+            if tenant is None:
+                tenant = self._tenants[tenant_name] = _Tenant(self._virtual_time)
+            tenant.queue.append(task)
+            if not self._idle_workers and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"{self.thread_name_prefix}_{len(self._threads)}",
+                    daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+            else:
+                self._condition.notify()
+
+    def _next_task(self) -> Optional[tuple[str, _Tenant, _Task]]:
+        # Called with the lock held
+        candidates = [
+            (tenant.virtual_time, name, tenant)
+            for name, tenant in self._tenants.items()
+            if tenant.queue
+        ]
+        if not candidates:
+            return None
+        virtual_time, name, tenant = min(candidates, key=lambda c: c[0])
+        self._virtual_time = max(self._virtual_time, virtual_time)
+        # Charged up front so that a tenant cannot take every free worker at once,
+        # corrected once the duration is known
+        tenant.virtual_time += tenant.cost / self.weights.get(name, 1.0)
+        tenant.running += 1
+        return name, tenant, tenant.queue.popleft()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while (next_task := self._next_task()) is None:
+                    if self._shutdown:
+                        return
+                    self._idle_workers += 1
+                    self._condition.wait()
+                    self._idle_workers -= 1
+            name, tenant, task = next_task
+
+            start = time.perf_counter()
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn(*task.args, **task.kwargs))
+                except BaseException as e:
+                    task.future.set_exception(e)
+            duration = time.perf_counter() - start
+
+            with self._condition:
+                tenant.virtual_time += (duration - tenant.cost) / self.weights.get(
+                    name, 1.0
+                )
+                tenant.cost += (duration - tenant.cost) * 0.2
+                tenant.running -= 1
+                if not tenant.queue and not tenant.running:
+                    # Forgotten once idle, the run keys would pile up otherwise
+                    del self._tenants[name]
+
+    def shutdown(self, wait: bool = True):
+        # Queued nodes still run
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def __enter__(self) -> "FairScheduler":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.shutdown()
+
+
+class TenantExecutor(Executor):
+    # The view of the scheduler given to one run
+    def __init__(self, scheduler: FairScheduler, tenant: str) -> None:
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self._futures: set[Future] = set()
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+        self.scheduler._submit(self.tenant, _Task(future, fn, args, kwargs))
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        # The shared workers keep running, only the nodes of this run are affected
+        with self._lock:
+            self._shutdown = True
+            futures = list(self._futures)
+        if cancel_futures:
+            for future in futures:
+                future.cancel()
+        if wait:
+            for future in futures:
+                if not future.cancelled():
+                    future.exception()
+
+
+_global_scheduler: Optional[FairScheduler] = None
+
+
+def set_global_scheduler(scheduler: Optional[FairScheduler]):
+    # Every later Pipeline.execute without executors submits its default resource
+    # class nodes to the scheduler, None restores the pool per run
+    global _global_scheduler
+    _global_scheduler = scheduler
+
+
+def get_global_scheduler() -> Optional[FairScheduler]:
+    return _global_scheduler
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import pickle
+import types
+from dataclasses import fields
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+
+from tuyaux.context import BasePipelineContext
+from tuyaux.exceptions import FingerprintMismatchError, PipelineSerializationError
+from tuyaux.pipeline import Pipeline
+from tuyaux.steps import FuncStep
+
+# Loading a pipeline unpickles it: only load files produced by trusted processes
+FORMAT_VERSION = 2
+
+
+def save_pipeline(
+    pipeline: Pipeline, ctx: BasePipelineContext, path: str | os.PathLike
+):
+    # The context is saved along the pipeline because the steps are bound to its vars
+    payload = {
+        "version": FORMAT_VERSION,
+        "fingerprint": pipeline_fingerprint(pipeline, ctx),
+        "pipeline": pipeline,
+        "context": ctx,
+    }
+    try:
+        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise PipelineSerializationError(
+            f"{pipeline.name} cannot be saved, step functions and node conditions "
+            f"must be importable module level callables: {e}"
+        ) from e
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def load_pipeline(
+    path: str | os.PathLike,
+) -> tuple[Pipeline, BasePipelineContext]:
+    with open(path, "rb") as file:
+        data = file.read()
+    try:
+        payload = pickle.loads(data)
+    except (pickle.UnpicklingError, AttributeError, ImportError, EOFError) as e:
+        raise PipelineSerializationError(
+            f"The pipeline saved in {path} cannot be loaded: {e}"
+        ) from e
+
+    if payload.get("version") != FORMAT_VERSION:
+        raise PipelineSerializationError(
+            f"The pipeline saved in {path} uses the format version "
+            f"{payload.get('version')}, expected {FORMAT_VERSION}"
+        )
+    pipeline: Pipeline = payload["pipeline"]
+    ctx: BasePipelineContext = payload["context"]
+    if pipeline_fingerprint(pipeline, ctx) != payload["fingerprint"]:
+        raise FingerprintMismatchError(
+            f"The steps or functions of {pipeline.name} changed since it was saved "
+            f"in {path}, the pipeline must be built again"
+        )
+    return pipeline, ctx
+
+
+def pipeline_fingerprint(pipeline: Pipeline, ctx: BasePipelineContext) -> str:
+    # Node iteration order changes between processes, so the parts are sorted
+    parts = {
+        _class_fingerprint(type(ctx)),
+        ",".join(field_.name for field_ in fields(ctx)),
+    }
+    for node in pipeline.nodes:
+        parts.update(_callable_fingerprint(condition) for condition in node.conditions)
+        for step in node.steps:
+            parts.add(_class_fingerprint(type(step)))
+            if isinstance(step, FuncStep):
+                parts.add(_callable_fingerprint(step.function))
+
+    digest = hashlib.sha256()
+    for part in sorted(parts):
+        digest.update(part.encode())
+    return digest.hexdigest()
+
+
+# Generated step classes are not kept alive by the fingerprints
+_CLASS_FINGERPRINTS: WeakKeyDictionary[type, str] = WeakKeyDictionary()
+
+
+def _class_fingerprint(cls: type) -> str:
+    fingerprint = _CLASS_FINGERPRINTS.get(cls)
+    if fingerprint is None:
+        fingerprint = _CLASS_FINGERPRINTS[cls] = _compute_class_fingerprint(cls)
+    return fingerprint
+
+
+def _compute_class_fingerprint(cls: type) -> str:
+    digest = hashlib.sha256()
+    for klass in cls.__mro__:
+        if klass.__module__ in ("builtins", "abc", "typing"):
+            continue
+        digest.update(f"{klass.__module__}.{klass.__qualname__}".encode())
+        for name, attribute in sorted(vars(klass).items()):
+            match attribute:
+                case staticmethod() | classmethod():
+                    attribute = attribute.__func__
+                case property():
+                    attribute = attribute.fget
+            if isinstance(attribute, types.FunctionType):
+                digest.update(name.encode())
+                _update_code(digest, attribute.__code__)
+    return digest.hexdigest()
+
+
+def _callable_fingerprint(func: Callable[..., Any]) -> str:
+    digest = hashlib.sha256(
+        f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', '')}".encode()
+    )
+    code = getattr(func, "__code__", None)
+    if code is not None:
+        _update_code(digest, code)
+    return digest.hexdigest()
+
+
+def _update_code(digest: "hashlib._Hash", code: types.CodeType):
+    # File names and line numbers are left out so that the fingerprint is the same
+    # on every worker whatever the install path
+    digest.update(code.co_code)
+    digest.update(" ".join(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _update_code(digest, const)
+        else:
+            digest.update(repr(const).encode())
@@ -0,0 +1,271 @@
+import argparse
+import importlib
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import fields
+from typing import Any, Iterable, Iterator, Optional
+
+from tuyaux.context import BasePipelineContext, NoDefault, PipeVar
+from tuyaux.exceptions import NoDefaultError, PipelineServerError
+from tuyaux.messages import picklable_error, recv_message, send_message
+from tuyaux.pipeline import DEFAULT_RESOURCE_CLASS, Pipeline
+
+
+class _Registration:
+    def __init__(self, pipeline: Pipeline, ctx: BasePipelineContext) -> None:
+        self.pipeline = pipeline
+        self.ctx = ctx
+        # The nodes hold the state of the run: a pipeline runs one request at a time
+        self.lock = threading.Lock()
+        self.vars: dict[str, PipeVar] = {
+            field_.name: getattr(ctx, field_.name)
+            for field_ in fields(ctx)
+            if isinstance(getattr(ctx, field_.name), PipeVar)
+        }
+        # Every request starts from the values the context had when registered
+        self.defaults = {name: _value(var) for name, var in self.vars.items()}
+
+
+class PipelineServer:
+    # Keeps built pipelines and their worker pools between runs and executes the run
+    # requests received on a Unix socket:
+    #   server = PipelineServer("/tmp/tuyaux.sock", thread_count=8)
+    #   server.register(pipeline, ctx)
+    #   server.serve_forever()
+    # Requests are pickled: the socket must only be reachable by trusted users.
+
+    def __init__(self, path: str, thread_count: int = 4) -> None:
+        self.path = path
+        self.thread_count = thread_count
+        self._pipelines: dict[str, _Registration] = {}
+        self._executors: dict[str, Executor] = {
+            DEFAULT_RESOURCE_CLASS: ThreadPoolExecutor(
+                thread_count, thread_name_prefix=DEFAULT_RESOURCE_CLASS
+            )
+        }
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._server: Optional[socket.socket] = None
+
+    def register(
+        self, pipeline: Pipeline, ctx: BasePipelineContext, name: Optional[str] = None
+    ):
+        if not pipeline.built:
+            pipeline.build()
+        # The resources live as long as the server
+        pipeline.resources.close_after_run = False
+        self._add_executors(pipeline.resource_classes)
+        with self._lock:
+            self._pipelines[name or pipeline.name] = _Registration(pipeline, ctx)
+
+    def _add_executors(self, resource_classes: dict[str, int]):
+        with self._lock:
+            for resource_class, max_workers in resource_classes.items():
+                if resource_class not in self._executors:
+                    self._executors[resource_class] = ThreadPoolExecutor(
+                        max_workers, thread_name_prefix=resource_class
+                    )
+
+    @contextmanager
+    def edit(self, name: str) -> Iterator[Pipeline]:
+        # Holds the runs of a registered pipeline while it is changed:
+        #   with server.edit("pipeline") as pipeline:
+        #       pipeline.insert_node(node, [parent_node])
+        registration = self._pipelines.get(name)
+        if registration is None:
+            raise PipelineServerError(f"No pipeline is registered as {name!r}")
+        with registration.lock:
+            yield registration.pipeline
+            # The new nodes may use new resource classes
+            self._add_executors(registration.pipeline.resource_classes)
+
+    def run(
+        self,
+        name: str,
+        values: Optional[dict[str, Any]] = None,
+        outputs: Optional[Iterable[str]] = None,
+        targets: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> tuple[dict[str, Any], Optional[BaseException]]:
+        registration = self._pipelines.get(name)
+        if registration is None:
+            raise PipelineServerError(f"No pipeline is registered as {name!r}")
+        names = [*(values or {}), *(outputs or ()), *(targets or ())]
+        unknown_fields = [
+            field_name for field_name in names if field_name not in registration.vars
+        ]
+        if unknown_fields:
+            raise PipelineServerError(
+                f"{name!r} has no context fields named {unknown_fields}"
+            )
+
+        with registration.lock:
+            ctx = registration.ctx
+            for field_name, value in registration.defaults.items():
+                registration.vars[field_name].set(value)
+            for field_name, value in (values or {}).items():
+                registration.vars[field_name].set(value)
+            ctx.thread_count = self.thread_count
+            pipeline = registration.pipeline
+            pipeline.execute(
+                ctx,
+                timeout=timeout,
+                targets=(
+                    None
+                    if targets is None
+                    else [registration.vars[target] for target in targets]
+                ),
+                executors=self._executors,
+            )
+            results = {
+                field_name: _value(registration.vars[field_name])
+                for field_name in (registration.vars if outputs is None else outputs)
+            }
+            return {
+                field_name: value
+                for field_name, value in results.items()
+                if value is not NoDefault
+            }, pipeline.runtime_error
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            # Left by a server that did not close
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        logging.info(f"Serving {list(self._pipelines)} on {self.path}")
+        while not self._closed.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=self._serve_client, args=(sock,), daemon=True
+            ).start()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.serve_forever, name="tuyaux-server", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def close(self):
+        self._closed.set()
+        if self._server is not None:
+            self._server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        for executor in self._executors.values():
+            executor.shutdown()
+        for registration in self._pipelines.values():
+            registration.pipeline.resources.close()
+
+    def __enter__(self) -> "PipelineServer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def _serve_client(self, sock: socket.socket):
+        send_lock = threading.Lock()
+        with sock:
+            while True:
+                try:
+                    message = recv_message(sock)
+                except (OSError, ConnectionError):
+                    return
+                response: tuple
+                match message:
+                    case ("run", name, values, outputs, targets, timeout):
+                        try:
+                            results, error = self.run(
+                                name, values, outputs, targets, timeout
+                            )
+                            response = ("result", results, picklable_error(error))
+                        except Exception as e:
+                            response = ("error", picklable_error(e))
+                    case _:
+                        response = (
+                            "error",
+                            PipelineServerError(f"Unknown request {message[0]!r}"),
+                        )
+                try:
+                    send_message(sock, send_lock, response)
+                except OSError:
+                    return
+
+
+class PipelineClient:
+    def __init__(self, path: str) -> None:
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._send_lock = threading.Lock()
+
+    def run(
+        self,
+        pipeline: str,
+        values: Optional[dict[str, Any]] = None,
+        outputs: Optional[Iterable[str]] = None,
+        targets: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> dict[str, Any]:
+        # Returns the values of the requested context fields, all of them by default,
+        # and raises the error of a failed run
+        send_message(
+            self._sock,
+            self._send_lock,
+            (
+                "run",
+                pipeline,
+                values,
+                None if outputs is None else list(outputs),
+                None if targets is None else list(targets),
+                timeout,
+            ),
+        )
+        match recv_message(self._sock):
+            case ("result", results, None):
+                return results
+            case ("result", _, error) | ("error", error):
+                raise error
+            case message:
+                raise PipelineServerError(f"Unexpected response {message[0]!r}")
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self) -> "PipelineClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+def _value(var: PipeVar) -> Any:
+    try:
+        return var.get()
+    except NoDefaultError:
+        return NoDefault
+
+
+if __name__ == "__main__":
+    # python -m tuyaux.server SOCKET_PATH MODULE:FACTORY [MODULE:FACTORY ...]
+    # Each factory is called once and returns a (pipeline, context) pair
+    parser = argparse.ArgumentParser(prog="python -m tuyaux.server")
+    parser.add_argument("path")
+    parser.add_argument("factories", nargs="+")
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with PipelineServer(args.path, args.threads) as server:
+        for factory_path in args.factories:
+            module_name, factory_name = factory_path.split(":")
+            factory = getattr(importlib.import_module(module_name), factory_name)
+            server.register(*factory())
+        server.serve_forever()
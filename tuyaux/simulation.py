@@ -0,0 +1,219 @@
+import heapq
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from itertools import count
+from typing import TYPE_CHECKING, AbstractSet, Iterable, Optional
+
+from tuyaux.context import PipeVar
+from tuyaux.exceptions import SimulationError
+from tuyaux.pipeline import DEFAULT_RESOURCE_CLASS, PipeNode, Pipeline
+
+if TYPE_CHECKING:
+    from tuyaux.metrics import PipelineMetrics
+
+
+@dataclass
+class SimulationResult:
+    workers: int
+    makespan: float
+    # Share of the time the workers of the default resource class were busy
+    utilization: float
+    # Start and end time of every node
+    schedule: dict[PipeNode, tuple[float, float]] = field(default_factory=dict)
+
+
+class ScheduleSimulator:
+    # Replays the scheduling of a built pipeline without running any step:
+    #   simulator = ScheduleSimulator(pipeline, durations={"load": 0.5})
+    #   print(simulator.report(simulator.sweep(range(1, 17))))
+    # The duration of a node comes from durations, keyed by node or node name, then
+    # its estimated_duration, the duration of its last run, the mean durations of
+    # its step classes in metrics and finally default_duration. Like the scheduler,
+    # each resource class has its own FIFO queue, required nodes are queued first
+    # and a worker goes on with a ready child of its class. Conditions, errors and
+    # the adaptive concurrency limit are not simulated.
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        durations: Optional[dict[PipeNode | str, float]] = None,
+        metrics: Optional["PipelineMetrics"] = None,
+        default_duration: float = 0.0,
+        overhead: float = 0.0,
+        targets: Optional[Iterable[PipeVar]] = None,
+    ) -> None:
+        if not pipeline.final_node.parent_nodes:
+            raise SimulationError(f"{pipeline.name} must be built to be simulated")
+        pipeline.validate_resource_classes()
+        self.pipeline = pipeline
+        # Scheduling cost added to every node
+        self.overhead = overhead
+        nodes: AbstractSet[PipeNode]
+        if targets is None:
+            nodes = pipeline.nodes
+            self.children = {node: tuple(node.child_nodes) for node in nodes}
+            self.parent_counts = {node: len(node.parent_nodes) for node in nodes}
+        else:
+            plan = pipeline.target_plan(targets)
+            nodes = plan.nodes
+            self.children = dict(plan.children)
+            self.parent_counts = dict(plan.parent_counts)
+
+        # Nodes whose duration is unknown and taken as default_duration
+        self.missing_estimates: list[str] = []
+        self.durations = {
+            node: self._estimate(node, durations or {}, metrics, default_duration)
+            for node in nodes
+        }
+
+    def _estimate(
+        self,
+        node: PipeNode,
+        durations: dict[PipeNode | str, float],
+        metrics: Optional["PipelineMetrics"],
+        default_duration: float,
+    ) -> float:
+        for estimate in (
+            durations.get(node),
+            durations.get(node.name),
+            node.estimated_duration,
+            node.last_duration,
+        ):
+            if estimate is not None:
+                return estimate
+        if metrics is not None:
+            histograms = [
+                metrics.step_durations.get(type(step).__name__) for step in node.steps
+            ]
+            measured = [h for h in histograms if h is not None and h.count]
+            if histograms and len(measured) == len(histograms):
+                return sum(h.sum / h.count for h in measured)
+        if node is not self.pipeline.root_node and node is not self.pipeline.final_node:
+            self.missing_estimates.append(node.name)
+        return default_duration
+
+    def run(self, workers: int) -> SimulationResult:
+        if workers < 1:
+            raise SimulationError(f"At least one worker is needed, got {workers}")
+        pipeline = self.pipeline
+        free_workers = {DEFAULT_RESOURCE_CLASS: workers, **pipeline.resource_classes}
+        queues: dict[str, deque[PipeNode]] = defaultdict(deque)
+        pending_parents = dict(self.parent_counts)
+        # (end time, order of start, node, nodes run in a row by its worker)
+        events: list[tuple[float, int, PipeNode, int]] = []
+        order = count()
+        schedule: dict[PipeNode, tuple[float, float]] = {}
+        busy_time = 0.0
+
+        def start(node: PipeNode, now: float, inlined: int):
+            nonlocal busy_time
+            end = now + self.overhead + self.durations[node]
+            schedule[node] = (now, end)
+            if node.resource_class == DEFAULT_RESOURCE_CLASS:
+                busy_time += end - now
+            heapq.heappush(events, (end, next(order), node, inlined))
+
+        def dispatch(now: float):
+            for resource_class, queue in queues.items():
+                while queue and free_workers[resource_class]:
+                    free_workers[resource_class] -= 1
+                    start(queue.popleft(), now, 0)
+
+        queues[pipeline.root_node.resource_class].append(pipeline.root_node)
+        dispatch(0.0)
+        now = 0.0
+        while events:
+            now, _, node, inlined = heapq.heappop(events)
+            ready_nodes = []
+            for child_node in self.children.get(node, ()):
+                pending_parents[child_node] -= 1
+                if not pending_parents[child_node]:
+                    ready_nodes.append(child_node)
+            ready_nodes.sort(key=lambda ready_node: ready_node.optional)
+
+            continuation = None
+            if inlined < pipeline.inline_limit:
+                continuation = next(
+                    (
+                        child_node
+                        for child_node in ready_nodes
+                        if child_node.resource_class == node.resource_class
+                    ),
+                    None,
+                )
+            for child_node in ready_nodes:
+                if child_node is not continuation:
+                    queues[child_node.resource_class].append(child_node)
+            if continuation is not None:
+                start(continuation, now, inlined + 1)
+            else:
+                free_workers[node.resource_class] += 1
+            dispatch(now)
+
+        makespan = schedule[pipeline.final_node][1]
+        return SimulationResult(
+            workers,
+            makespan,
+            busy_time / (workers * makespan) if makespan else 0.0,
+            schedule,
+        )
+
+    def sweep(self, worker_counts: Iterable[int]) -> list[SimulationResult]:
+        return [self.run(workers) for workers in worker_counts]
+
+    def critical_path(self) -> tuple[float, list[PipeNode]]:
+        # Longest chain of durations: no worker count makes the run shorter
+        pending_parents = dict(self.parent_counts)
+        finish: dict[PipeNode, float] = {}
+        previous: dict[PipeNode, Optional[PipeNode]] = {}
+        root_node = self.pipeline.root_node
+        finish[root_node] = self.overhead + self.durations[root_node]
+        previous[root_node] = None
+        ready = deque([root_node])
+        while ready:
+            node = ready.popleft()
+            for child_node in self.children.get(node, ()):
+                end = finish[node] + self.overhead + self.durations[child_node]
+                if end > finish.get(child_node, -1.0):
+                    finish[child_node] = end
+                    previous[child_node] = node
+                pending_parents[child_node] -= 1
+                if not pending_parents[child_node]:
+                    ready.append(child_node)
+
+        path: list[PipeNode] = []
+        path_node: Optional[PipeNode] = self.pipeline.final_node
+        while path_node is not None:
+            path.append(path_node)
+            path_node = previous[path_node]
+        return finish[self.pipeline.final_node], path[::-1]
+
+    def recommend(
+        self, results: list[SimulationResult], tolerance: float = 0.05
+    ) -> SimulationResult:
+        # The fewest workers within tolerance of the shortest makespan
+        best = min(result.makespan for result in results)
+        return min(
+            (result for result in results if result.makespan <= best * (1 + tolerance)),
+            key=lambda result: result.workers,
+        )
+
+    def report(self, results: list[SimulationResult]) -> str:
+        lines = [f"{'workers':>7}  {'makespan':>10}  {'utilization':>11}  speedup"]
+        baseline = results[0].makespan if results else 0.0
+        for result in results:
+            speedup = baseline / result.makespan if result.makespan else 1.0
+            lines.append(
+                f"{result.workers:>7}  {result.makespan:>9.3f}s  "
+                f"{result.utilization:>10.1%}  x{speedup:.2f}"
+            )
+        duration, path = self.critical_path()
+        lines.append(
+            f"Critical path ({duration:.3f}s): "
+            + " -> ".join(node.name for node in path)
+        )
+        if results:
+            lines.append(f"Recommended workers: {self.recommend(results).workers}")
+        if self.missing_estimates:
+            lines.append(f"No estimate for {sorted(self.missing_estimates)}")
+        return "\n".join(lines)
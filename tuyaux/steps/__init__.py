@@ -1,2 +1,2 @@
 from .base_step import BaseStep, StatusEnum
-from .steps import RootStep, FinalStep, FuncStep
+from .steps import RootStep, FinalStep, FuncStep, CopyStep
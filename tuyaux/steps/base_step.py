@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Generic, ParamSpec, TypeVar
+from typing import Any, Optional, Generic, ParamSpec, TypeVar
 from enum import Flag, auto
+from tuyaux.cancellation import CancelToken
 from tuyaux.context import ContextT, InVar, OutVar
 
 
@@ -15,8 +16,9 @@ class StatusEnum(Flag):
     SKIPPED = auto()
     CONDITION_FAILED = auto()
     ERROR = auto()
+    CANCELLED = auto()
     OK = COMPLETE | SKIPPED
-    KO = ERROR | CONDITION_FAILED
+    KO = ERROR | CONDITION_FAILED | CANCELLED
 
 
 class BaseStep(ABC, Generic[ContextT]):
@@ -41,9 +43,16 @@ class BaseStep(ABC, Generic[ContextT]):
             "color": "orange",
             "style": "rounded",
         },
+        StatusEnum.CANCELLED: {
+            "shape": "box",
+            "color": "red",
+            "style": "rounded,dashed",
+        },
     }
     DEFAULT_STYLE: dict[str, str] = {}
     COMMENT = ""
+    # Names of the pipeline resource pools the step takes a handle from
+    RESOURCES: tuple[str, ...] = ()
 
     def __init__(self, name: Optional[str] = None, comment: str = "") -> None:
         super().__init__()
@@ -53,11 +62,29 @@ class BaseStep(ABC, Generic[ContextT]):
         self._id = id(self)
         self._str_id = str(self._id)
         self.error: Optional[BaseException] = None
+        # Replaced by the token of the node running the step, poll it in long steps
+        self.cancel_token = CancelToken()
+        # Handles of the required resources, set by the pipeline while the step runs
+        self.resources: dict[str, Any] = {}
+
+    def __getstate__(self) -> dict:
+        # Handles stay in the process that acquired them
+        state = self.__dict__.copy()
+        state["resources"] = {}
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._id = id(self)
+        self._str_id = str(self._id)
 
     @abstractmethod
     def run(self, ctx: ContextT):
         ...
 
+    def required_resources(self) -> tuple[str, ...]:
+        return self.RESOURCES
+
     @property
     def id(self) -> int:
         return self._id
@@ -86,6 +113,10 @@ class BaseStep(ABC, Generic[ContextT]):
         self._status = StatusEnum.ERROR
         self.error = err
 
+    def cancelled(self, err: BaseException):
+        self._status = StatusEnum.CANCELLED
+        self.error = err
+
     def style(self) -> dict[str, str]:
         return self.STYLES.get(self._status, self.DEFAULT_STYLE)
 
@@ -98,13 +129,20 @@ class BaseStep(ABC, Generic[ContextT]):
     # TODO: adjust these methods depending on the usage (add recursive type checks?)
     # Do not hesitate to reimplate in your classes to avoid parsing the obj dict and
     # directly store your Input/Outputs in an object attribute
+    # The vars are collected on the first call, once the subclass set them
 
     def inputs(self) -> tuple[InVar, ...]:
-        return tuple(
-            value for value in self.__dict__.values() if isinstance(value, InVar)
-        )
+        inputs = self.__dict__.get("_inputs_cache")
+        if inputs is None:
+            inputs = self._inputs_cache = tuple(
+                value for value in self.__dict__.values() if isinstance(value, InVar)
+            )
+        return inputs
 
     def outputs(self) -> tuple[OutVar, ...]:
-        return tuple(
-            value for value in self.__dict__.values() if isinstance(value, OutVar)
-        )
+        outputs = self.__dict__.get("_outputs_cache")
+        if outputs is None:
+            outputs = self._outputs_cache = tuple(
+                value for value in self.__dict__.values() if isinstance(value, OutVar)
+            )
+        return outputs
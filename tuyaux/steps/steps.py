@@ -1,9 +1,13 @@
+import inspect
 from abc import abstractmethod
-from typing import Any, Callable, Generic, ParamSpec, Self, TypeVar
+from functools import partial
+from typing import Any, Callable, Generic, Iterable, ParamSpec, Self, TypeVar
+from weakref import WeakKeyDictionary, WeakValueDictionary
 from tuyaux.context import BasePipelineContext, ContextT
 from tuyaux.steps.base_step import BaseStep
 from tuyaux.context import PipeVar, InVar, OutVar
-
+from tuyaux.exceptions import StepSignatureError
+from tuyaux.resources import Resource
 
 P = ParamSpec("P")
 R = TypeVar("R")
@@ -45,6 +49,42 @@ class FinalStep(RootStep):
         self.completed()
 
 
+class CopyStep(BaseStep):
+    NAME = "Copy variables"
+
+    def __init__(
+        self,
+        pairs: Iterable[tuple[InVar, OutVar]],
+        name: str | None = None,
+        comment: str = "",
+    ) -> None:
+        super().__init__(name=name, comment=comment)
+        self.pairs = tuple(pairs)
+
+    def run(self, ctx: BasePipelineContext):
+        for source, target in self.pairs:
+            target.set(source.get())
+        self.completed()
+
+    def label(self) -> str:
+        return "\n".join(
+            (
+                super().label(),
+                *(
+                    f"{source.as_pipevar().get_name()} -> "
+                    f"{target.as_pipevar().get_name()}"
+                    for source, target in self.pairs
+                ),
+            )
+        )
+
+    def inputs(self) -> tuple[InVar, ...]:
+        return tuple(source for source, _ in self.pairs)
+
+    def outputs(self) -> tuple[OutVar, ...]:
+        return tuple(target for _, target in self.pairs)
+
+
 class FuncStep(BaseStep, Generic[P, R]):
     NAME = "Function step"
 
@@ -68,22 +108,94 @@ class FuncStep(BaseStep, Generic[P, R]):
         self._inputs = tuple(var for var in args if isinstance(var, InVar)) + tuple(
             var for var in kwargs.values() if isinstance(var, InVar)
         )
-        super().__init__()
+        self._resources = self.RESOURCES + tuple(
+            arg.name for arg in (*args, *kwargs.values()) if isinstance(arg, Resource)
+        )
+        signature = _signature(self.function)
+        if signature is not None:
+            try:
+                signature.bind(*args, **kwargs)
+            except TypeError as e:
+                raise StepSignatureError(
+                    f"{self.name}: the arguments do not match the signature of "
+                    f"{getattr(self.function, '__qualname__', self.function)}"
+                    f"{signature}: {e}"
+                ) from e
+        self._bind()
 
-    def run(self, ctx: BasePipelineContext):
-        args = tuple(
-            arg.get() if isinstance(arg, PipeVar) else arg for arg in self.args
+    def _bind(self):
+        # The binding plan is computed once: run only fetches the variables, the
+        # constants are copied as they are
+        args, kwargs = self.args, self.kwargs
+        self._arg_values = list(args)
+        self._arg_getters = tuple(
+            (i, self._getter(arg)) for i, arg in enumerate(args) if _is_bound(arg)
+        )
+        self._kwarg_getters = tuple(
+            (key, self._getter(arg)) for key, arg in kwargs.items() if _is_bound(arg)
         )
-        kwargs = {
-            key: (arg.get() if isinstance(arg, PipeVar) else arg)
-            for key, arg in self.kwargs.items()
-        }
-        self._cast_results(self.function(*args, **kwargs))  # type: ignore
+        self._output_setters = tuple(var.set for var in self._outputs)
+        self._function = self.function
+
+    def _getter(self, arg: PipeVar | InVar | Resource) -> Callable[[], Any]:
+        if isinstance(arg, Resource):
+            # The pipeline fills the dict in place, it is never replaced
+            return partial(self.resources.__getitem__, arg.name)
+        return arg.get
+
+    def __getstate__(self) -> dict:
+        # The binding plan is cheaper to compute again than to unpickle
+        state = super().__getstate__()
+        for key in _BINDING_PLAN:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state: dict):
+        super().__setstate__(state)
+        self._bind()
+
+    def run(self, ctx: BasePipelineContext):
+        # Same as arguments(), inlined to save a call per step
+        args = self._arg_values.copy()
+        for i, get in self._arg_getters:
+            args[i] = get()
+        kwargs = self.kwargs
+        if self._kwarg_getters:
+            kwargs = kwargs.copy()
+            for key, get in self._kwarg_getters:
+                kwargs[key] = get()
+        results = self._function(*args, **kwargs)
+        if isinstance(results, tuple):
+            self._cast_results(results)
+        else:
+            # Fast path of _cast_results: a single result is set to every output
+            for set_ in self._output_setters:
+                set_(results)
         self.completed()
 
+    def arguments(self) -> tuple[list[Any], dict[str, Any]]:
+        args = self._arg_values.copy()
+        for i, get in self._arg_getters:
+            args[i] = get()
+        kwargs = self.kwargs
+        if self._kwarg_getters:
+            kwargs = kwargs.copy()
+            for key, get in self._kwarg_getters:
+                kwargs[key] = get()
+        return args, kwargs
+
+    def set_results(self, results: R) -> None:
+        self._cast_results(results)
+
     def _cast_results(self, results: R) -> None:
+        if not isinstance(results, tuple):
+            # A single result is set to every output var
+            for set_ in self._output_setters:
+                set_(results)
+            return
+
         cast_size = len(self._outputs)
-        outputs = results if isinstance(results, tuple) else (results,)
+        outputs = results
         output_size = len(outputs)
         if cast_size == output_size:
             for r, var in zip(outputs, self._outputs):
@@ -125,16 +237,34 @@ class FuncStep(BaseStep, Generic[P, R]):
 
     @property
     @abstractmethod
-    def function(self) -> Callable[P, R]:
-        ...
+    def function(self) -> Callable[P, R]: ...
 
     @classmethod
     def new(cls, func: Callable[P, R]) -> type[Self]:
+        # One class per function, kept while steps or callers use it
+        try:
+            step_class = _FUNC_STEP_CLASSES.get((cls, func))
+        except TypeError:
+            # Unhashable callables, e.g. dataclass instances, get a new class
+            return cls._new_class(func)
+        if step_class is None:
+            step_class = _FUNC_STEP_CLASSES[(cls, func)] = cls._new_class(func)
+        return step_class
+
+    @classmethod
+    def _new_class(cls, func: Callable[P, R]) -> type[Self]:
         class NewFuncStep(cls):
             @property
             def function(self) -> Callable[P, R]:
                 return func
 
+            def __reduce__(self):
+                # The generated class cannot be pickled by reference, the step is
+                # rebuilt from its base class and (importable) function instead
+                return (_restore_func_step, (cls, func, self.__getstate__()))
+
+        # Tells the generated classes apart, e.g. in the metrics of each step class
+        NewFuncStep.__name__ = f"{cls.__name__}[{getattr(func, '__name__', func)}]"
         return NewFuncStep  # type: ignore
 
     def inputs(self) -> tuple[InVar, ...]:
@@ -142,3 +272,55 @@ class FuncStep(BaseStep, Generic[P, R]):
 
     def outputs(self) -> tuple[OutVar, ...]:
         return self._outputs
+
+    def required_resources(self) -> tuple[str, ...]:
+        return self._resources
+
+
+_FUNC_STEP_CLASSES: WeakValueDictionary[tuple[type, Callable], type] = (
+    WeakValueDictionary()
+)
+
+_BINDING_PLAN = (
+    "_arg_values",
+    "_arg_getters",
+    "_kwarg_getters",
+    "_output_setters",
+    "_function",
+)
+
+
+def _is_bound(arg: Any) -> bool:
+    # Arguments whose value is only known when the step runs
+    return isinstance(arg, (PipeVar, InVar, Resource))
+
+
+_SIGNATURES: WeakKeyDictionary[Callable, inspect.Signature | None] = WeakKeyDictionary()
+
+
+def _signature(func: Callable[..., Any]) -> inspect.Signature | None:
+    try:
+        if func in _SIGNATURES:
+            return _SIGNATURES[func]
+    except TypeError:
+        # Unhashable callables and builtins cannot be weak keys
+        return _read_signature(func)
+    signature = _SIGNATURES[func] = _read_signature(func)
+    return signature
+
+
+def _read_signature(func: Callable[..., Any]) -> inspect.Signature | None:
+    try:
+        return inspect.signature(func)
+    except (TypeError, ValueError):
+        # Some builtins do not expose their signature
+        return None
+
+
+def _restore_func_step(
+    base_class: type[FuncStep], func: Callable, state: dict
+) -> FuncStep:
+    step_class = base_class.new(func)
+    step = step_class.__new__(step_class)
+    step.__setstate__(state)
+    return step